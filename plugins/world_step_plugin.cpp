@@ -0,0 +1,76 @@
+#include <memory>
+#include <string>
+#include <thread>
+
+#include <boost/bind.hpp>
+
+#include <gazebo/common/Plugin.hh>
+#include <gazebo/physics/World.hh>
+#include <ros/ros.h>
+#include <ros/callback_queue.h>
+#include <ros/subscribe_options.h>
+#include <std_msgs/UInt32.h>
+
+namespace gazebo
+{
+/*
+ * Steps a paused world by the tick count of every std_msgs/UInt32 on a ROS topic
+ * One subscription lives as long as the world so training doesn't start a gz process per action
+ * Topic is /gazebo/multi_step unless the plugin element has a <topic>
+ */
+class WorldStepPlugin : public WorldPlugin
+{
+public:
+  ~WorldStepPlugin()
+  {
+    if (node)
+    {
+      queue.clear();
+      queue.disable();
+      node->shutdown();
+      queueThread.join();
+    }
+  }
+
+  void Load(physics::WorldPtr _world, sdf::ElementPtr _sdf)
+  {
+    if (!ros::isInitialized())
+    {
+      ROS_FATAL_STREAM("WorldStepPlugin needs ROS, start gazebo with libgazebo_ros_api_plugin.so");
+      return;
+    }
+
+    world = _world;
+    std::string topic = "/gazebo/multi_step";
+    if (_sdf->HasElement("topic"))
+      topic = _sdf->Get<std::string>("topic");
+
+    node.reset(new ros::NodeHandle("world_step_plugin"));
+    ros::SubscribeOptions options = ros::SubscribeOptions::create<std_msgs::UInt32>(
+        topic, 10, boost::bind(&WorldStepPlugin::OnMultiStep, this, _1), ros::VoidPtr(), &queue);
+    subscriber = node->subscribe(options);
+    queueThread = std::thread(&WorldStepPlugin::QueueThread, this);
+  }
+
+private:
+  // Blocks until the world has run all ticks, later requests wait in the queue
+  void OnMultiStep(const std_msgs::UInt32ConstPtr &msg)
+  {
+    world->Step(msg->data);
+  }
+
+  void QueueThread()
+  {
+    while (node->ok())
+      queue.callAvailable(ros::WallDuration(0.01));
+  }
+
+  physics::WorldPtr world;
+  std::unique_ptr<ros::NodeHandle> node;
+  ros::Subscriber subscriber;
+  ros::CallbackQueue queue;  // Own queue so stepping doesn't block other gazebo_ros callbacks
+  std::thread queueThread;
+};
+
+GZ_REGISTER_WORLD_PLUGIN(WorldStepPlugin)
+}
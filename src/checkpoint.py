@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import queue
+import random
+import atexit
+import threading
+
+import numpy as np
+
+
+class CheckpointManager():
+    '''
+    Writes checkpoints from a background thread so acting and training don't wait for disk
+    Weights are snapshotted by the caller, this class only gets numpy arrays
+    Files are written to a temp name and renamed, so a crash never leaves a half written checkpoint
+    Only the last keepLast checkpoints are kept
+
+    Checkpoint of episode X is X.npz (model and optimizer weights) and X.json (training params)
+    If a ReplayStore is given, replay memory is saved with every checkpoint too
+    '''
+    def __init__(self, savePath, keepLast=5, replayStore=None):
+        self.savePath = savePath
+        self.keepLast = keepLast  # Older checkpoints are deleted, None keeps all
+        self.replayStore = replayStore  # Memory snapshots are written here, only the latest one is kept
+        self.lastError = None  # Last exception of the writer thread
+
+        self.queue = queue.Queue(maxsize=2)  # Pending checkpoints, save blocks only if writer is this far behind
+        self.thread = threading.Thread(target=self.writerLoop, daemon=True)
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def save(self, episode, weights, optimizerWeights, params, memory=None):
+        '''
+        Queue a checkpoint to be written
+        New rows of memory are copied here, files are written in background
+        '''
+        weights = [np.array(w, copy=True) for w in weights]
+        optimizerWeights = [np.array(w, copy=True) for w in optimizerWeights]
+        replaySnapshot = None
+        if memory is not None and self.replayStore is not None:
+            replaySnapshot = self.replayStore.collect(memory)
+        self.queue.put((episode, weights, optimizerWeights, dict(params), replaySnapshot))
+
+    def writerLoop(self):
+        '''
+        Background thread, writes queued checkpoints until close is called
+        '''
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.write(*item)
+            except Exception as e:
+                self.lastError = e
+                print("Error while saving checkpoint", e)
+            finally:
+                self.queue.task_done()
+
+    def write(self, episode, weights, optimizerWeights, params, replaySnapshot=None):
+        '''
+        Write a checkpoint atomically and delete old ones
+        Params file is renamed last, so a checkpoint with a json file is complete
+        Model is saved even if replay memory can't be, the memory error is raised after it
+        '''
+        replayError = None
+        if replaySnapshot is not None:
+            try:
+                self.replayStore.write(replaySnapshot, dict(params, episode=episode))
+            except Exception as e:
+                replayError = e
+
+        arrays = {'weight{}'.format(i): w for i, w in enumerate(weights)}
+        arrays.update({'optimizer{}'.format(i): w for i, w in enumerate(optimizerWeights)})
+
+        weightsPath = self.weightsPath(episode)
+        with open(weightsPath + '.tmp', 'wb') as outfile:
+            np.savez(outfile, **arrays)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(weightsPath + '.tmp', weightsPath)
+
+        paramPath = self.paramPath(episode)
+        with open(paramPath + '.tmp', 'w') as outfile:
+            json.dump(params, outfile)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(paramPath + '.tmp', paramPath)
+
+        self.removeOld()
+
+        if replayError is not None:
+            raise replayError
+
+    def weightsPath(self, episode):
+        return os.path.join(self.savePath, str(episode) + '.npz')
+
+    def paramPath(self, episode):
+        return os.path.join(self.savePath, str(episode) + '.json')
+
+    def episodes(self):
+        '''
+        return episodes of complete checkpoints in savePath, sorted
+        '''
+        episodes = []
+        for name in os.listdir(self.savePath):
+            match = re.match(r'^(\d+)\.json$', name)
+            if match and os.path.exists(self.weightsPath(match.group(1))):
+                episodes.append(int(match.group(1)))
+        return sorted(episodes)
+
+    def removeOld(self):
+        '''
+        Delete all but the last keepLast checkpoints
+        '''
+        if self.keepLast is None:
+            return
+
+        for episode in self.episodes()[:-self.keepLast]:
+            for path in (self.paramPath(episode), self.weightsPath(episode)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def load(self, episode):
+        '''
+        Read a checkpoint written by this class
+
+        return model weights, optimizer weights and params
+        '''
+        with np.load(self.weightsPath(episode)) as data:
+            weightCount = sum(name.startswith('weight') for name in data.files)
+            optimizerCount = sum(name.startswith('optimizer') for name in data.files)
+            weights = [data['weight{}'.format(i)] for i in range(weightCount)]
+            optimizerWeights = [data['optimizer{}'.format(i)] for i in range(optimizerCount)]
+
+        with open(self.paramPath(episode)) as infile:
+            params = json.load(infile)
+
+        return weights, optimizerWeights, params
+
+    def loadMemory(self, memory, episode=None):
+        '''
+        Fill memory from the replay store if it has a snapshot
+        Only a snapshot saved with the given episode is loaded
+
+        return params saved with the memory or None
+        '''
+        if self.replayStore is None or not self.replayStore.exists():
+            return None
+        return self.replayStore.load(memory, episode)
+
+    def flush(self):
+        '''
+        Wait until every queued checkpoint is written
+        '''
+        self.queue.join()
+
+    def close(self):
+        '''
+        Write queued checkpoints and stop writer thread
+        '''
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+def getRandomStates():
+    '''
+    return states of python and numpy global random generators in a json serializable dict
+    '''
+    version, internalState, gauss = random.getstate()
+    name, keys, pos, hasGauss, cachedGaussian = np.random.get_state()
+    return {
+        'random': [version, list(internalState), gauss],
+        'numpyRandom': [name, keys.tolist(), pos, hasGauss, cachedGaussian]
+    }
+
+
+def setRandomStates(states):
+    '''
+    Restore random generators from getRandomStates output
+    '''
+    version, internalState, gauss = states['random']
+    random.setstate((version, tuple(internalState), gauss))
+    name, keys, pos, hasGauss, cachedGaussian = states['numpyRandom']
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, hasGauss, cachedGaussian))
@@ -0,0 +1,121 @@
+import time
+
+import rospy
+
+from gazebo_msgs.srv import SpawnModel, DeleteModel, SetModelState
+from std_srvs.srv import Empty
+
+
+class ServiceClient():
+    '''
+    Persistent proxy of a ROS service
+    Waits for the service only when connecting, reconnects with bounded backoff if a call fails
+    Keeps timing stats of calls
+    '''
+    def __init__(self, name, serviceClass, retries=5, backoff=0.1, maxBackoff=2.0, connectTimeout=30):
+        self.name = name
+        self.serviceClass = serviceClass
+        self.retries = retries  # Call attempts before giving up
+        self.backoff = backoff  # First wait in seconds after a failed call, doubled at every retry
+        self.maxBackoff = maxBackoff  # Longest wait between retries
+        self.connectTimeout = connectTimeout  # Seconds to wait for service to be available
+        self.proxy = None
+        self.resetStats()
+
+    def connect(self):
+        '''
+        Wait for service and open a persistent connection
+        '''
+        rospy.wait_for_service(self.name, timeout=self.connectTimeout)
+        self.proxy = rospy.ServiceProxy(self.name, self.serviceClass, persistent=True)
+
+    def close(self):
+        '''
+        Close connection, next call reconnects
+        '''
+        if self.proxy is not None:
+            self.proxy.close()
+            self.proxy = None
+
+    def __call__(self, *args):
+        '''
+        Call service
+
+        return service response
+        '''
+        delay = self.backoff
+        for attempt in range(self.retries):
+            try:
+                if self.proxy is None:
+                    self.connect()
+
+                start = time.time()
+                response = self.proxy(*args)
+                elapsed = time.time() - start
+
+                self.callCount += 1
+                self.totalTime += elapsed
+                self.maxTime = max(self.maxTime, elapsed)
+                return response
+            except (rospy.ServiceException, rospy.ROSException) as e:
+                self.failCount += 1
+                rospy.logwarn(self.name + " call failed, reconnecting... " + str(attempt) + " " + str(e))
+                self.close()
+                time.sleep(delay)
+                delay = min(delay * 2, self.maxBackoff)
+
+        raise rospy.ServiceException(self.name + " call failed " + str(self.retries) + " times")
+
+    def stats(self):
+        '''
+        return call count, fail count, mean and max call time in dict
+        '''
+        meanTime = self.totalTime / self.callCount if self.callCount else 0.0
+        return {'calls': self.callCount, 'fails': self.failCount, 'meanTime': meanTime, 'maxTime': self.maxTime}
+
+    def resetStats(self):
+        self.callCount = 0
+        self.failCount = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+
+
+class GazeboClient():
+    '''
+    Gazebo services used by environments
+    Every service is connected once and the connection is kept open
+    '''
+    def __init__(self):
+        self.pausePhysics = ServiceClient('/gazebo/pause_physics', Empty)
+        self.unpausePhysics = ServiceClient('/gazebo/unpause_physics', Empty)
+        self.resetSimulation = ServiceClient('/gazebo/reset_simulation', Empty)
+        self.setModelState = ServiceClient('/gazebo/set_model_state', SetModelState)
+        self.spawnSdfModel = ServiceClient('/gazebo/spawn_sdf_model', SpawnModel)
+        self.deleteModel = ServiceClient('/gazebo/delete_model', DeleteModel)
+
+        self.services = [self.pausePhysics, self.unpausePhysics, self.resetSimulation,
+                         self.setModelState, self.spawnSdfModel, self.deleteModel]
+
+    def stats(self):
+        '''
+        return stats of every service in dict
+        '''
+        return {service.name: service.stats() for service in self.services}
+
+    def resetStats(self):
+        '''
+        Start stats of every service from zero
+        '''
+        for service in self.services:
+            service.resetStats()
+
+    def formatStats(self):
+        '''
+        return stats of called services as a printable string
+        '''
+        lines = []
+        for name, stat in self.stats().items():
+            if stat['calls'] or stat['fails']:
+                lines.append('{} | Calls: {} | Fails: {} | Mean: {:.1f}ms | Max: {:.1f}ms'.format(
+                    name, stat['calls'], stat['fails'], stat['meanTime'] * 1000, stat['maxTime'] * 1000))
+        return '\n'.join(lines)
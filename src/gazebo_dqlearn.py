@@ -0,0 +1,522 @@
+import rospy
+import numpy as np
+import math
+
+import random
+
+from gazebo_msgs.msg import ModelState
+from geometry_msgs.msg import Twist
+from geometry_msgs.msg import Pose
+
+from nav_msgs.msg import Odometry
+from sensor_msgs.msg import LaserScan
+
+from maze_worlds import SPAWN_POINTS
+from ros_sensors import LatestMessage, quaternionToYaw
+from gazebo_client import GazeboClient
+from world_stepper import WorldStepper
+from state_reward import calcStates, calcRewards, TARGET_REACH_RANGE
+from profiling import PROFILER
+
+"""
+Gazebo environment shared by all robots
+Robot specific names come from ROBOT_PROFILES, module parameters below are defaults of GazeboGymEnv
+
+There are 3 different maze map in this packet
+After start one of them with launch file you have to give the same maze to environment.
+
+Options:
+maze1
+maze2
+maze3
+"""
+SELECT_MAP = "maze1"
+
+"""
+How the goal sign is shown in Gazebo
+
+Options:
+respawn: Delete and spawn the goal sign for every new target
+move: Spawn the goal sign once then move it to new targets
+none: Don't show the goal sign at all (Fastest for headless training)
+"""
+GOAL_MARKER_MODE = "move"
+
+"""
+How an action is simulated
+
+Options:
+realtime: Unpause physics, publish action, wait for the next sensor data and pause again
+lockstep: Keep physics paused, publish action and advance it by exactly TICKS_PER_STEP ticks
+Lockstep keeps the duration of an action same even with higher real_time_factor
+"""
+STEP_MODE = "realtime"
+TICKS_PER_STEP = 200  # 0.2 seconds with 0.001 max_step_size of maze worlds
+
+"""
+Names that differ between robots
+Add a new profile to use the environment with another robot
+"""
+ROBOT_PROFILES = {
+    "mantis": {
+        "modelName": "mantis",  # Model name in Gazebo
+        "nodeName": "mantis_gym_env",
+        "cmdVelTopic": "/diffdrive/cmd_vel",
+        "scanTopic": "/mantis/base_scan",
+        "odomTopic": "/odom",
+        "scanPeriod": 0.2,  # Seconds between sensor updates, lockstep accepts messages this old
+        "odomPeriod": 0.02,  # diff_drive_controller default publish_rate
+    },
+    "turtlebot3": {
+        "modelName": "turtlebot3_waffle",
+        "nodeName": "turtlebot3_gym_env",
+        "cmdVelTopic": "/cmd_vel",
+        "scanTopic": "/scan",
+        "odomTopic": "/odom",
+        "scanPeriod": 0.2,
+        "odomPeriod": 1 / 30,
+    },
+}
+
+class AgentPosController():
+    '''
+    This class control robot position
+    We teleport our agent when environment reset
+    So agent start from different position in every episode
+    '''
+    def __init__(self, gazebo, modelName, spawnPoints):
+        self.gazebo = gazebo  # Gazebo service client
+        self.agent_model_name = modelName
+        self.spawnPoints = spawnPoints  # Possible x, y positions of the agent
+
+    def teleportRandom(self):
+        '''
+        Teleport agent return new x and y point
+
+        return agent posX, posY in list
+        '''
+
+        model_state_msg = ModelState()
+        model_state_msg.model_name = self.agent_model_name
+        
+        # Get random position for agent
+        pose = Pose()
+        pose.position.x, pose.position.y = random.choice(self.spawnPoints)
+
+        model_state_msg.pose = pose
+        model_state_msg.twist = Twist()
+
+        model_state_msg.reference_frame = "world"
+
+        # Start teleporting in Gazebo, client retries with backoff on failure
+        try:
+            self.gazebo.setModelState(model_state_msg)
+        except Exception as e:
+            rospy.logfatal("Error when teleporting agent " + str(e))
+            return "Err", "Err"
+    
+        return pose.position.x, pose.position.y
+
+class GoalController():
+    """
+    This class controls target model and position
+    """
+    def __init__(self, gazebo, spawnPoints, markerMode=GOAL_MARKER_MODE):
+        self.gazebo = gazebo  # Gazebo service client
+        self.spawnPoints = spawnPoints  # Possible x, y positions of the goal
+        self.markerMode = markerMode  # respawn, move or none
+        self.model_path = "../models/gazebo/goal_sign/model.sdf"
+        f = open(self.model_path, 'r')
+        self.model = f.read()
+
+        self.goal_position = Pose()
+        self.goal_position.position.x = None  # Initial positions
+        self.goal_position.position.y = None
+        self.last_goal_x = self.goal_position.position.x
+        self.last_goal_y = self.goal_position.position.y
+
+        self.model_name = 'goal_sign'
+        self.check_model = False  # This used to checking before spawn model if there is already a model
+
+    def respawnModel(self):
+        '''
+        Spawn model in Gazebo
+        '''
+        if self.check_model:  # This used to checking before spawn model if there is already a model
+            return
+
+        try:
+            self.gazebo.spawnSdfModel(self.model_name, self.model, 'robotos_name_space', self.goal_position, "world")
+            self.check_model = True
+        except Exception as e:
+            rospy.logfatal("Error when spawning the goal sign " + str(e))
+
+    def deleteModel(self):
+        '''
+        Delete model from Gazebo
+        Service returns after model is deleted so no need to wait after it
+        '''
+        if not self.check_model:
+            return
+
+        try:
+            self.gazebo.deleteModel(self.model_name)
+            self.check_model = False
+        except Exception as e:
+            rospy.logfatal("Error when deleting the goal sign " + str(e))
+
+    def moveModel(self):
+        '''
+        Move already spawned model to goal position
+        '''
+        model_state_msg = ModelState()
+        model_state_msg.model_name = self.model_name
+        model_state_msg.pose = self.goal_position
+        model_state_msg.twist = Twist()
+        model_state_msg.reference_frame = "world"
+
+        try:
+            self.gazebo.setModelState(model_state_msg)
+        except Exception as e:
+            rospy.logfatal("Error when moving the goal sign " + str(e))
+
+    def showModel(self):
+        '''
+        Show goal model at goal position according to marker mode
+        '''
+        if self.markerMode == "move" and self.check_model:
+            self.moveModel()
+        elif self.markerMode != "none":
+            self.respawnModel()
+
+    def calcTargetPoint(self):
+        """
+        This function return a target point randomly for robot
+        """
+        if self.markerMode == "respawn":
+            self.deleteModel()
+
+        # Check last goal position not same with new goal
+        while True:
+            self.goal_position.position.x, self.goal_position.position.y = random.choice(self.spawnPoints)
+
+            if self.last_goal_x != self.goal_position.position.x:
+                if self.last_goal_y != self.goal_position.position.y:
+                    break
+
+        # Show goal model
+        self.showModel()
+
+        self.last_goal_x = self.goal_position.position.x
+        self.last_goal_y = self.goal_position.position.y
+
+        # Inform user
+        rospy.logwarn("New goal position : " + str(self.goal_position.position.x) + " , " + str(self.goal_position.position.y))
+
+        return self.goal_position.position.x, self.goal_position.position.y
+
+    def getTargetPoint(self):
+        return self.goal_position.position.x, self.goal_position.position.y
+
+
+class GazeboGymEnv():
+    '''
+    Main Gazebo environment class
+    Contains reset and step function
+    robot is a key of ROBOT_PROFILES
+    '''
+    def __init__(self, robot="mantis", selectMap=SELECT_MAP, goalMarkerMode=GOAL_MARKER_MODE,
+                 stepMode=STEP_MODE, ticksPerStep=TICKS_PER_STEP):
+        if robot not in ROBOT_PROFILES:
+            raise ValueError("Unknown robot " + str(robot) + ", options: " + ", ".join(ROBOT_PROFILES))
+        profile = ROBOT_PROFILES[robot]
+
+        # Initialize the node
+        rospy.init_node(profile["nodeName"], anonymous=True)
+
+        # Connect to gazebo
+        self.velPub = rospy.Publisher(profile["cmdVelTopic"], Twist, queue_size=5)
+        self.gazebo = GazeboClient()  # Keeps Gazebo service connections open
+
+        # Keep sensor subscribers open instead of subscribing at every step
+        self.laserSub = LatestMessage(profile["scanTopic"], LaserScan)
+        self.odomSub = LatestMessage(profile["odomTopic"], Odometry)
+        self.scanPeriod = profile["scanPeriod"]
+        self.odomPeriod = profile["odomPeriod"]
+
+        self.laserPointCount = 24  # Raw scan is min pooled to this many sectors whatever the scanner resolution
+        self.minCrashRange = 0.2  # Asume crash below this distance
+        self.laserMinRange = 0.2  # Modify laser data and fix min range to
+        self.laserMaxRange = 10.0  # Modify laser data and fix max range to
+        self.stateSize = self.laserPointCount + 4  # Laser(arr), heading, distance, obstacleMinRange, obstacleAngle
+        self.actionSize = 5  # Size of the robot's actions
+
+        self.targetDistance = 0  # Distance to target
+
+        self.targetPointX = 0  # Target Pos X
+        self.targetPointY = 0  # Target Pos Y
+
+        # Means robot reached target point. True at beginning to calc random point in reset func
+        self.isTargetReached = True
+        self.goalCont = GoalController(self.gazebo, SPAWN_POINTS[selectMap], goalMarkerMode)
+        self.agentController = AgentPosController(self.gazebo, profile["modelName"], SPAWN_POINTS[selectMap])
+
+        if stepMode == "lockstep":
+            self.stepper = WorldStepper(ticksPerStep)
+            self.pauseGazebo()  # Physics is only advanced by stepper
+        else:
+            self.stepper = None
+
+
+    def pauseGazebo(self):
+        '''
+        Pause the simulation
+        '''
+        try:
+            self.gazebo.pausePhysics()
+        except Exception:
+            print("/gazebo/pause_physics service call failed")
+
+    def unpauseGazebo(self):
+        '''
+        Unpause the simulation
+        '''
+        try:
+            self.gazebo.unpausePhysics()
+        except Exception:
+            print("/gazebo/unpause_physics service call failed")
+
+    def resetGazebo(self):
+        '''
+        Reset simualtion to initial phase
+        '''
+        startTime = rospy.Time(0)  # Simulation time after the reset
+        try:
+            self.gazebo.resetSimulation()
+        except Exception:
+            print("/gazebo/reset_simulation service call failed")
+            startTime = None
+
+        # Simulation time starts again so cached messages are invalid
+        self.laserSub.clear()
+        self.odomSub.clear()
+        if self.stepper is not None:
+            self.stepper.reset(startTime)
+
+    def getLaserData(self, after):
+        '''
+        Wait for the first laser scan stamped after given ROS time, any scan if it is None
+        
+        return laser scan in 2D list
+        '''
+        try:
+            laserData = self.laserSub.waitForFresh(after, timeout=5)
+            return laserData
+        except Exception as e:
+            rospy.logfatal("Error to get laser data " + str(e))
+
+    def getOdomData(self, after):
+        '''
+        Wait for the first odom stamped after given ROS time, any odom if it is None
+        Modify odom data quaternion to euler
+
+        return yaw, posX, posY of robot known as Pos2D
+        '''
+        try:
+            odomData = self.odomSub.waitForFresh(after, timeout=5)
+            odomData = odomData.pose.pose
+            quat = odomData.orientation
+            yaw = quaternionToYaw(quat.x, quat.y, quat.z, quat.w)
+            robotX = odomData.position.x
+            robotY = odomData.position.y
+            return yaw, robotX, robotY
+
+        except Exception as e:
+            rospy.logfatal("Error to get odom data " + str(e))
+
+    def observe(self, afterReset=False):
+        '''
+        Let simulation run for one action and get sensor data at its end
+        In realtime mode physics has to be unpaused before, it is paused after observation
+        After a reset any message is taken, caches are cleared and /clock may still hold the time before it
+
+        return laser scan and odom data
+        '''
+        if self.stepper is None:
+            after = None if afterReset else rospy.get_rostime()
+            with PROFILER.timer("env.scanWait"):
+                laserData = self.getLaserData(after)
+            with PROFILER.timer("env.odomWait"):
+                odomData = self.getOdomData(after)
+            with PROFILER.timer("env.pause"):
+                self.pauseGazebo()
+        else:
+            with PROFILER.timer("env.worldStep"):
+                targetTime = self.stepper.step()
+            # Every sensor is waited for within its own update period of the final tick
+            scanAfter = None if afterReset else self.stepper.sampleAfter(targetTime, self.scanPeriod)
+            odomAfter = None if afterReset else self.stepper.sampleAfter(targetTime, self.odomPeriod)
+            with PROFILER.timer("env.scanWait"):
+                laserData = self.getLaserData(scanAfter)
+            with PROFILER.timer("env.odomWait"):
+                odomData = self.getOdomData(odomAfter)
+
+        return laserData, odomData
+
+    def calcDistance(self, x1, y1, x2, y2):
+        '''
+        Calculate euler distance of given two points
+
+        return distance in float
+        '''
+        return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
+
+    def calculateState(self, laserData, odomData):
+        '''
+        Modify laser data
+        Calculate heading angle
+        Calculate distance to target
+        Calculate min range to nearest obstacle
+        Calculate angle to nearest obstacle
+
+        returns state as np.array and crash info
+
+        State contains:
+        laserData, heading, distance, obstacleMinRange, obstacleAngle
+        '''
+        state, isCrash = calcStates(laserData.ranges, *odomData, self.targetPointX, self.targetPointY,
+                                    self.minCrashRange, self.laserMinRange, self.laserMaxRange,
+                                    self.laserPointCount)
+        return state, bool(isCrash)
+
+    def step(self, action):
+        '''
+        Act in envrionment
+        After action return new state
+        Calculate reward
+        Calculate bot is crashed or not
+        Calculate is episode done or not
+
+        returns state as np.array
+
+        State contains:
+        laserData, heading, distance, obstacleMinRange, obstacleAngle, reward, done
+        '''
+        if self.stepper is None:
+            with PROFILER.timer("env.unpause"):
+                self.unpauseGazebo()
+
+        # Move
+        maxAngularVel = 1.5
+        angVel = ((self.actionSize - 1)/2 - action) * maxAngularVel / 2
+
+        velCmd = Twist()
+        velCmd.linear.x = 0.15
+        velCmd.angular.z = angVel
+
+        with PROFILER.timer("env.publish"):
+            self.velPub.publish(velCmd)
+
+        # More basic actions
+        """
+        if action == 0: #BRAKE LEFT
+            velCmd = Twist()
+            velCmd.linear.x = 0.17
+            velCmd.angular.z = 1.6
+            self.velPub.publish(velCmd)
+        elif action == 1: #LEFT
+            velCmd = Twist()
+            velCmd.linear.x = 0.17
+            velCmd.angular.z = 0.8
+            self.velPub.publish(velCmd)
+        elif action == 2: #FORWARD
+            velCmd = Twist()
+            velCmd.linear.x = 0.17
+            velCmd.angular.z = 0.0
+            self.velPub.publish(velCmd)
+        elif action == 3: #RIGHT
+            velCmd = Twist()
+            velCmd.linear.x = 0.17
+            velCmd.angular.z = -0.8
+            self.velPub.publish(velCmd)
+        elif action == 4: #BRAKE RIGHT
+            velCmd = Twist()
+            velCmd.linear.x = 0.17
+            velCmd.angular.z = -1.6
+            self.velPub.publish(velCmd)       
+        """
+
+        # Observe
+        laserData, odomData = self.observe()
+
+        with PROFILER.timer("env.state"):
+            state, isCrash = self.calculateState(laserData, odomData)
+
+        done = isCrash
+
+        distanceToTarget = state[-3]
+
+        if distanceToTarget < TARGET_REACH_RANGE:  # Reached to target
+            self.isTargetReached = True
+
+        # Calc reward
+        # reference https://emanual.robotis.com/docs/en/platform/turtlebot3/ros2_machine_learning/
+        reward = float(calcRewards(state, action, self.targetDistance, isCrash, self.isTargetReached))
+
+        if not isCrash and self.isTargetReached:
+            # Reached to target
+            rospy.logwarn("Reached to target!")
+            # Calc new target point
+            self.targetPointX, self.targetPointY = self.goalCont.calcTargetPoint()
+            self.isTargetReached = False
+
+        return np.asarray(state), reward, done
+
+    def reset(self):
+        '''
+        Reset the envrionment
+        Reset bot position
+
+        returns state as np.array
+
+        State contains:
+        laserData, heading, distance, obstacleMinRange, obstacleAngle
+        '''
+        # Service calls of the last episode, slow or failing calls show up here
+        serviceStats = self.gazebo.formatStats()
+        if serviceStats:
+            print(serviceStats)
+        self.gazebo.resetStats()
+
+        self.resetGazebo()
+
+        while True:
+            # Teleport bot to a random point
+            agentX, agentY = self.agentController.teleportRandom()
+            if self.calcDistance(self.targetPointX, self.targetPointY, agentX, agentY) > self.minCrashRange:
+                break
+            else:
+                rospy.logerr("Reteleporting the bot!")
+
+        if self.isTargetReached:
+            while True:
+                self.targetPointX, self.targetPointY = self.goalCont.calcTargetPoint()
+                if self.calcDistance(self.targetPointX, self.targetPointY, agentX, agentY) > self.minCrashRange:
+                    self.isTargetReached = False
+                    break
+                else:
+                    rospy.logerr("Recalculating the target point!")
+        else:
+            # Reset simulation moves the goal sign back to where it was spawned
+            self.goalCont.showModel()
+
+        # Unpause simulation to make observation
+        if self.stepper is None:
+            self.unpauseGazebo()
+        laserData, odomData = self.observe(afterReset=True)
+
+        state, isCrash = self.calculateState(laserData, odomData)
+        self.targetDistance = state[-3]
+        self.stateSize = len(state)
+
+        return np.asarray(state)  # Return state
@@ -0,0 +1,248 @@
+import math
+import random
+
+import numpy as np
+
+from maze_worlds import SPAWN_POINTS, loadWorldObstacles
+from state_reward import calcStates, calcRewards, TARGET_REACH_RANGE
+from profiling import PROFILER
+
+"""
+Headless 2D version of the Gazebo environments
+Maze walls are read from the world files and the lidar is ray casted against them.
+Robot moves with differential drive kinematics so it doesn't need ROS or Gazebo.
+It is useful to pretrain or benchmark agents on machines without a simulator.
+
+Options for SELECT_MAP:
+maze1
+maze2
+maze3
+"""
+SELECT_MAP = "maze1"
+
+
+class LidarSimulator():
+    '''
+    Planar lidar that casts rays analytically against wall segments and cylinders
+    '''
+    def __init__(self, segments, cylinders, beamCount=24, angleMin=0.0, angleMax=2 * math.pi, rangeMax=3.5):
+        self.segments = segments  # Wall segments x1, y1, x2, y2
+        self.cylinders = cylinders  # Cylinders x, y, radius
+        self.rangeMax = rangeMax  # Beams that hit nothing in this range return inf like Gazebo
+
+        # Beams are spread over [angleMin, angleMax) like a 360 degree scanner
+        self.beamAngles = angleMin + np.arange(beamCount) * (angleMax - angleMin) / beamCount
+
+        self.segStart = segments[:, :2]
+        self.segDir = segments[:, 2:] - segments[:, :2]
+
+    def scan(self, x, y, yaw):
+        '''
+        Cast all beams from the robot pose
+
+        return ranges in np.array
+        '''
+        angles = yaw + self.beamAngles
+        dirs = np.stack((np.cos(angles), np.sin(angles)), axis=1)  # (beams, 2)
+        origin = np.array([x, y])
+
+        ranges = np.full(len(angles), np.inf)
+
+        if len(self.segments):
+            # Solve origin + t * dir = segStart + u * segDir for every beam and segment pair
+            rel = self.segStart - origin  # (segments, 2)
+            denom = dirs[:, 0:1] * self.segDir[:, 1] - dirs[:, 1:2] * self.segDir[:, 0]  # (beams, segments)
+            relCrossSeg = rel[:, 0] * self.segDir[:, 1] - rel[:, 1] * self.segDir[:, 0]  # (segments,)
+            relCrossDir = rel[:, 0] * dirs[:, 1:2] - rel[:, 1] * dirs[:, 0:1]  # (beams, segments)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = relCrossSeg / denom
+                u = relCrossDir / denom
+            hit = (denom != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+            ranges = np.minimum(ranges, np.where(hit, t, np.inf).min(axis=1))
+
+        if len(self.cylinders):
+            rel = origin - self.cylinders[:, :2]  # (cylinders, 2)
+            b = dirs @ rel.T  # (beams, cylinders)
+            c = np.sum(rel ** 2, axis=1) - self.cylinders[:, 2] ** 2
+            disc = b ** 2 - c
+            sqrtDisc = np.sqrt(np.maximum(disc, 0))
+            t = -b - sqrtDisc
+            t = np.where(t < 0, -b + sqrtDisc, t)
+            hit = (disc >= 0) & (t >= 0)
+            ranges = np.minimum(ranges, np.where(hit, t, np.inf).min(axis=1))
+
+        ranges[ranges > self.rangeMax] = np.inf
+        return ranges
+
+
+class HeadlessGymEnv():
+    '''
+    Headless environment class
+    Contains reset and step function with the same contract as GazeboGymEnv
+    '''
+    def __init__(self, selectMap=SELECT_MAP, stepTime=0.2, seed=None, beamCount=24):
+        self.laserPointCount = 24  # Raw scan is min pooled to this many sectors whatever the scanner resolution
+        self.minCrashRange = 0.2  # Asume crash below this distance
+        self.laserMinRange = 0.2  # Modify laser data and fix min range to
+        self.laserMaxRange = 10.0  # Modify laser data and fix max range to
+        self.stateSize = self.laserPointCount + 4  # Laser(arr), heading, distance, obstacleMinRange, obstacleAngle
+        self.actionSize = 5  # Size of the robot's actions
+
+        self.stepTime = stepTime  # Simulated seconds that one action lasts
+        self.beamCount = beamCount  # Beams of simulated scanner, can be more than laserPointCount
+        self.linearVel = 0.15  # Forward speed of every action
+        self.maxAngularVel = 1.5  # Angular speed of the sharpest turn
+
+        self.targetDistance = 0  # Distance to target
+
+        self.targetPointX = 0  # Target Pos X
+        self.targetPointY = 0  # Target Pos Y
+        self.lastTargetX = None
+        self.lastTargetY = None
+
+        # Robot pose
+        self.robotX = 0.0
+        self.robotY = 0.0
+        self.robotYaw = 0.0
+
+        # Means robot reached target point. True at beginning to calc random point in reset func
+        self.isTargetReached = True
+
+        self.rng = random.Random(seed)
+        self.spawnPoints = SPAWN_POINTS[selectMap]
+        self.lidar = LidarSimulator(*loadWorldObstacles(selectMap), beamCount=beamCount)
+
+    def calcTargetPoint(self):
+        '''
+        Choose a new target point randomly
+
+        return target posX, posY
+        '''
+        # Check last goal position not same with new goal
+        while True:
+            targetX, targetY = self.rng.choice(self.spawnPoints)
+            if self.lastTargetX != targetX and self.lastTargetY != targetY:
+                break
+
+        self.lastTargetX = targetX
+        self.lastTargetY = targetY
+
+        return targetX, targetY
+
+    def moveRobot(self, action):
+        '''
+        Integrate differential drive kinematics for one action
+        '''
+        angVel = ((self.actionSize - 1)/2 - action) * self.maxAngularVel / 2
+        newYaw = self.robotYaw + angVel * self.stepTime
+
+        if abs(angVel) > 1e-9:
+            # Exact integration on a circular arc
+            radius = self.linearVel / angVel
+            self.robotX += radius * (math.sin(newYaw) - math.sin(self.robotYaw))
+            self.robotY -= radius * (math.cos(newYaw) - math.cos(self.robotYaw))
+        else:
+            self.robotX += self.linearVel * self.stepTime * math.cos(self.robotYaw)
+            self.robotY += self.linearVel * self.stepTime * math.sin(self.robotYaw)
+
+        # Keep yaw in [-pi, pi] like odometry does
+        self.robotYaw = math.atan2(math.sin(newYaw), math.cos(newYaw))
+
+    def observe(self):
+        '''
+        Get simulated laser ranges and odom
+
+        return laser ranges and yaw, posX, posY of robot
+        '''
+        ranges = self.lidar.scan(self.robotX, self.robotY, self.robotYaw)
+        return ranges, (self.robotYaw, self.robotX, self.robotY)
+
+    def calcDistance(self, x1, y1, x2, y2):
+        '''
+        Calculate euler distance of given two points
+
+        return distance in float
+        '''
+        return math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
+
+    def calculateState(self, ranges, odomData):
+        '''
+        Same as GazeboGymEnv.calculateState but gets ranges as np.array
+
+        returns state as np.array and crash info
+        '''
+        state, isCrash = calcStates(ranges, *odomData, self.targetPointX, self.targetPointY,
+                                    self.minCrashRange, self.laserMinRange, self.laserMaxRange,
+                                    self.laserPointCount)
+        return state, bool(isCrash)
+
+    def step(self, action):
+        '''
+        Act in envrionment
+        After action return new state
+        Calculate reward
+        Calculate bot is crashed or not
+        Calculate is episode done or not
+
+        returns state as np.array
+
+        State contains:
+        laserData, heading, distance, obstacleMinRange, obstacleAngle, reward, done
+        '''
+        with PROFILER.timer("env.move"):
+            self.moveRobot(action)
+
+        with PROFILER.timer("env.raycast"):
+            observation = self.observe()
+
+        with PROFILER.timer("env.state"):
+            state, isCrash = self.calculateState(*observation)
+
+        done = isCrash
+
+        distanceToTarget = state[-3]
+
+        if distanceToTarget < TARGET_REACH_RANGE:  # Reached to target
+            self.isTargetReached = True
+
+        # Calc reward
+        # reference https://emanual.robotis.com/docs/en/platform/turtlebot3/ros2_machine_learning/
+        reward = float(calcRewards(state, action, self.targetDistance, isCrash, self.isTargetReached))
+
+        if not isCrash and self.isTargetReached:
+            # Reached to target
+            # Calc new target point
+            self.targetPointX, self.targetPointY = self.calcTargetPoint()
+            self.isTargetReached = False
+
+        return np.asarray(state), reward, done
+
+    def reset(self):
+        '''
+        Reset the envrionment
+        Reset bot position
+
+        returns state as np.array
+
+        State contains:
+        laserData, heading, distance, obstacleMinRange, obstacleAngle
+        '''
+        while True:
+            # Teleport bot to a random point
+            self.robotX, self.robotY = self.rng.choice(self.spawnPoints)
+            self.robotYaw = 0.0
+            if self.calcDistance(self.targetPointX, self.targetPointY, self.robotX, self.robotY) > self.minCrashRange:
+                break
+
+        if self.isTargetReached:
+            while True:
+                self.targetPointX, self.targetPointY = self.calcTargetPoint()
+                if self.calcDistance(self.targetPointX, self.targetPointY, self.robotX, self.robotY) > self.minCrashRange:
+                    self.isTargetReached = False
+                    break
+
+        state, isCrash = self.calculateState(*self.observe())
+        self.targetDistance = state[-3]
+        self.stateSize = len(state)
+
+        return np.asarray(state)  # Return state
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import subprocess
+
+import numpy as np
+
+"""
+Measures how long importing modules takes in a fresh interpreter
+Agent scripts should import in a fraction of Keras import time since Keras and matplotlib are loaded lazily
+
+Usage: python3 import_benchmark.py [module ...]
+"""
+MODULES = ['lidar_dqlearn', 'mantis_lidar_dqlearn', 'headless_gym_env', 'numpy_qnet',
+           'keras', 'matplotlib.pyplot']
+REPEAT = 5  # Every module is imported in this many fresh interpreters
+
+
+def importTime(module):
+    '''
+    Import module in a new interpreter, interpreter start up time is not included
+
+    return seconds in float or None if import fails
+    '''
+    code = 'import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)'.format(module)
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    modules = sys.argv[1:] or MODULES
+
+    for module in modules:
+        times = [importTime(module) for _ in range(REPEAT)]
+        if None in times:
+            print('{:<28} failed to import'.format(module))
+        else:
+            print('{:<28} median: {:7.1f}ms | min: {:7.1f}ms'.format(module, np.median(times) * 1000, min(times) * 1000))
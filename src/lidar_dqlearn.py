@@ -0,0 +1,723 @@
+#!/usr/bin/env python3
+
+from replay_memory import ReplayMemory, PrioritizedReplayMemory, ReplayStore, NStepAccumulator
+from checkpoint import CheckpointManager, getRandomStates, setRandomStates
+from numpy_qnet import NumpyQNetwork
+from metrics import MetricsLogger, ThroughputMeter
+from profiling import PROFILER
+from target_sync import TargetSync, blendWeights
+from optimizer_state import getOptimizerWeights, setOptimizerWeights
+
+import time
+import os
+import sys
+import json
+import copy
+import random
+import argparse
+import numpy as np
+
+# Keras is imported where it is first used, it takes seconds to import
+
+"""
+Default run configuration
+Every key can be overridden by a JSON config file and then by command line options
+
+robot: mantis or turtlebot3 (ROBOT_PROFILES in gazebo_dqlearn.py)
+map: maze1, maze2 or maze3
+headless: Use headless lidar simulator instead of Gazebo (No ROS needed)
+envCount: Number of headless environments stepped together
+actorCount: Number of parallel actor processes, 0 means acting in this process
+metrics: Log step and episode metrics to savePath/metrics/ (plot them with plot_metrics.py)
+profile: Time env and train step phases and print their percentiles after every episode
+env: Extra parameters of the environment class like stepMode, ticksPerStep, goalMarkerMode
+agent: Agent attributes to override like learningRate, batchSize, savePath
+"""
+DEFAULT_CONFIG = {
+    "robot": "mantis",
+    "map": "maze1",
+    "headless": False,
+    "envCount": 1,
+    "actorCount": 0,
+    "metrics": True,
+    "profile": False,
+    "env": {},
+    "agent": {},
+}
+
+class Agent:
+    '''
+    Main class for agent
+    Attributes set in __init__ are defaults, params overrides them before memory and models are built
+    '''
+    def __init__(self, stateSize, actionSize, params=None):
+        self.isTrainActive = True  # Train model (Make it False for just testing)
+        self.loadModel = False  # Load model from file
+        self.loadEpisodeFrom = 0  # Load Xth episode from file
+        self.episodeCount = 40000  # Total episodes
+        self.stateSize = stateSize  # Step size get from env
+        self.actionSize = actionSize  # Action size get from env
+        self.targetUpdateCount = 2000  # Update target model at every X step
+        self.softTargetUpdate = 0.0  # If above 0 target model moves this much to online model after every update instead
+        self.saveModelAtEvery = 10  # Save model at every X episode
+        self.keepCheckpoints = 5  # Keep only the last X saved episodes
+        self.saveMemory = True  # Save replay memory with the model so a restarted training skips warm up
+        self.discountFactor = 0.99  # For qVal calculations
+        self.nSteps = 1  # Rewards summed in a transition before bootstrapping (n-step returns)
+        self.learningRate = 0.0003  # For neural net model
+        self.epsilon = 1.0  # Epsilon start value
+        self.epsilonDecay = 0.99  # Epsilon decay value
+        self.epsilonMin = 0.05  # Epsilon minimum value
+        self.batchSize = 64  # Size of a miniBatch
+        self.trainEvery = 1  # Train model at every X steps
+        self.gradientSteps = 1  # Train calls at every training
+        self.minibatchesPerFit = 1  # Minibatches sampled together and trained with one train step call
+        self.actingSyncEvery = 20  # Copy online model weights to the acting network at every X gradient updates
+        self.learnStart = 100000  # Start to train model from this step
+        self.memorySize = 200000  # Size of the replay memory
+        self.prioritizedReplay = False  # Sample memory by TD error priorities instead of uniformly
+        self.priorityAlpha = 0.6  # How much prioritization is used (0 is uniform)
+        self.priorityBeta = 0.4  # Importance sampling start value, annealed to 1
+        self.priorityBetaIncrement = 0.000001  # Beta increase at every train step
+        self.timeOutLim = 1400  # Maximum step size for each episode
+        self.stepCounter = 0  # Total steps, target model is updated by it
+        self.savePath = '/tmp/mantisModel/'  # Model save path
+
+        for name, value in (params or {}).items():
+            if not hasattr(self, name):
+                raise ValueError("Unknown agent parameter " + str(name))
+            setattr(self, name, value)
+
+        # Main memory to keep batches
+        if self.prioritizedReplay:
+            self.memory = PrioritizedReplayMemory(self.memorySize, self.stateSize, self.priorityAlpha,
+                                                  self.priorityBeta, self.priorityBetaIncrement)
+        else:
+            self.memory = ReplayMemory(self.memorySize, self.stateSize)
+        self.nStepAccumulators = {}  # NStepAccumulator of every environment when nSteps is above 1
+
+        self.onlineModel = None  # Keras models, not built when just testing a saved model
+        self.targetModel = None
+        self.targetSync = None  # Assigns online model weights to target model
+        self.trainStep = None  # Compiled train step of the online model
+        self.actingNetwork = None  # Numpy copy of the online model to select actions
+        self.actingSyncedAt = 0  # updateCount at the last copy to the acting network
+        self.loss = None  # Loss of the last train step
+        self.updateCount = 0  # Total gradient updates
+        self.stepsSinceTrain = 0  # Steps since the last training, for trainEvery
+
+        if self.isTrainActive or not self.loadModel:
+            self.initModels()
+
+        # Create model file path
+        try:
+            os.mkdir(self.savePath)
+        except Exception:
+            pass
+
+        # Checkpoints are written from a background thread
+        replayStore = ReplayStore(self.savePath + 'memory/') if self.saveMemory else None
+        self.checkpoints = CheckpointManager(self.savePath, self.keepCheckpoints, replayStore)
+
+    def initModels(self):
+        '''
+        Build online and target models
+        Actions are selected with a numpy copy of the online model, Keras predict is too slow for one state
+        '''
+        self.onlineModel = self.initNetwork()
+        self.targetModel = self.initNetwork()
+        self.targetSync = TargetSync(self.onlineModel, self.targetModel)
+        self.trainStep = self.initTrainStep()
+
+        self.updateTargetModel()
+
+        self.actingNetwork = NumpyQNetwork(self.onlineModel.get_weights())
+        self.actingSyncedAt = self.updateCount
+
+    def initNetwork(self):
+        '''
+        Build DNN
+
+        return Keras DNN model
+        '''
+        from keras.models import Sequential
+        from keras.optimizers import RMSprop
+        from keras.layers import Dense, Dropout
+
+        model = Sequential()
+
+        model.add(Dense(64, input_shape=(self.stateSize,), activation="relu", kernel_initializer="lecun_uniform"))
+        model.add(Dense(64, activation="relu", kernel_initializer="lecun_uniform"))
+        model.add(Dropout(0.3))
+        model.add(Dense(self.actionSize, activation="linear", kernel_initializer="lecun_uniform"))
+        model.compile(loss="mse", optimizer=RMSprop(learning_rate=self.learningRate, rho=0.9, epsilon=1e-06))
+        model.summary()
+
+        return model
+
+    def initTrainStep(self):
+        '''
+        Build graph compiled train step of the online model
+        A call trains every batchSize rows of its input as a minibatch
+        Targets are Double DQN targets, next action is selected by online model and evaluated by target model.
+        Next state value is discounted by discountFactor^steps of the transition.
+        They are calculated for all minibatches with one pass per model before training
+        Loss is only calculated on taken actions
+        With softTargetUpdate target weights are blended in place after every minibatch
+
+        return tf.function(states, actions, rewards, nextStates, dones, steps, sampleWeights)
+        which returns mean loss, TD errors and Q values of the last state
+        '''
+        import tensorflow as tf
+
+        onlineModel = self.onlineModel
+        targetModel = self.targetModel
+        optimizer = onlineModel.optimizer
+        batchSize = self.batchSize
+        discountFactor = self.discountFactor
+        softTargetUpdate = self.softTargetUpdate
+        weightPairs = self.targetSync.weightPairs
+
+        @tf.function
+        def trainStep(states, actions, rewards, nextStates, dones, steps, sampleWeights):
+            actions = tf.cast(actions, tf.int32)
+            discounts = tf.pow(discountFactor, tf.cast(steps, tf.float32)) * (1.0 - tf.cast(dones, tf.float32))
+            losses = []
+            tdErrors = []
+
+            nextActions = tf.argmax(onlineModel(nextStates, training=False), axis=1, output_type=tf.int32)
+            nextQ = tf.gather(targetModel(nextStates, training=False), nextActions, batch_dims=1)
+            targets = rewards + discounts * nextQ
+
+            for start in range(0, states.shape[0], batchSize):  # Unrolled, sample count is fixed
+                end = start + batchSize
+
+                with tf.GradientTape() as tape:
+                    qValues = onlineModel(states[start:end], training=True)
+                    tdError = targets[start:end] - tf.gather(qValues, actions[start:end], batch_dims=1)
+                    loss = tf.reduce_mean(sampleWeights[start:end] * tf.square(tdError))
+
+                gradients = tape.gradient(loss, onlineModel.trainable_variables)
+                optimizer.apply_gradients(zip(gradients, onlineModel.trainable_variables))
+
+                if softTargetUpdate > 0:
+                    blendWeights(weightPairs, softTargetUpdate)
+
+                losses.append(loss)
+                tdErrors.append(tdError)
+
+            return tf.reduce_mean(losses), tf.concat(tdErrors, axis=0), qValues[-1:]
+
+        return trainStep
+
+    def updateTargetModel(self):
+        '''
+        Update target model weights with online model weights
+        Variables are assigned in place, weights are not copied through numpy
+        Does nothing when just testing a saved model, there are no Keras models then
+        '''
+        if self.targetSync is None:
+            return
+        self.targetSync.copy()
+
+    def countStep(self):
+        '''
+        Count a training loop step
+        Target model is updated at every targetUpdateCount steps unless it follows online model softly
+        '''
+        self.stepCounter += 1
+        if self.softTargetUpdate == 0 and self.stepCounter % self.targetUpdateCount == 0:
+            self.updateTargetModel()
+
+    def syncActingNetwork(self):
+        '''
+        Copy online model weights to acting network once actingSyncEvery updates are made after the last copy
+        Copying after every update cost more than the action itself, actions lag a few updates instead
+        '''
+        if self.updateCount - self.actingSyncedAt >= self.actingSyncEvery:
+            self.copyActingNetwork()
+
+    def copyActingNetwork(self):
+        '''
+        Copy online model weights to acting network now
+        Does nothing when just testing a saved model, acting network is the loaded model then
+        '''
+        if self.onlineModel is None:
+            return
+        self.actingNetwork.setWeights(self.onlineModel.get_weights())
+        self.actingSyncedAt = self.updateCount
+
+    def saveModel(self, episode):
+        '''
+        Snapshot model, optimizer, replay memory and training params of the episode
+        Files are written in background
+        '''
+        params = {'epsilon': self.epsilon, 'stepCounter': self.stepCounter, 'randomStates': getRandomStates()}
+        self.checkpoints.save(episode, self.onlineModel.get_weights(), getOptimizerWeights(self.onlineModel.optimizer), params,
+                              self.memory if self.saveMemory else None)
+
+    def restoreModel(self, episode):
+        '''
+        Load model, optimizer and training params of the episode
+        Replay memory is loaded too when training so learning continues without warm up
+        When just testing a checkpoint only the numpy network is loaded, Keras is not imported
+        Models saved as .h5 files only restore weights and epsilon
+        '''
+        if os.path.exists(self.checkpoints.weightsPath(episode)):
+            weights, optimizerWeights, params = self.checkpoints.load(episode)
+
+            if self.onlineModel is None:
+                self.actingNetwork = NumpyQNetwork(weights)
+            else:
+                self.onlineModel.set_weights(weights)
+
+                if optimizerWeights:
+                    # Optimizer slots are created lazily at the first train step, they are built here if needed
+                    setOptimizerWeights(self.onlineModel.optimizer, self.onlineModel.trainable_variables,
+                                        optimizerWeights)
+        else:
+            from keras.models import load_model
+
+            if self.onlineModel is None:
+                self.initModels()
+            self.onlineModel.set_weights(load_model(self.savePath+str(episode)+".h5").get_weights())
+            with open(self.savePath+str(episode)+'.json') as outfile:
+                params = json.load(outfile)
+
+        self.epsilon = params.get('epsilon')
+        self.stepCounter = params.get('stepCounter', 0)
+        if 'randomStates' in params:
+            setRandomStates(params['randomStates'])
+        if self.onlineModel is not None:
+            self.updateTargetModel()
+            self.copyActingNetwork()
+
+        if self.isTrainActive and self.saveMemory:
+            memoryParams = self.checkpoints.loadMemory(self.memory, episode)
+            if memoryParams is not None and memoryParams.get('episode') != episode:
+                # Transitions of another run or a later episode would not match the restored model
+                print("Replay memory was saved at episode {}, not {}. Starting with empty memory".format(
+                    memoryParams.get('episode'), episode))
+            elif memoryParams is not None:
+                print("Replay memory loaded with {} transitions from episode {}".format(len(self.memory), episode))
+
+    def calcAction(self, state):
+        '''
+        Caculates an Action
+
+        returns action number in int
+        '''
+        
+        if np.random.rand() <= self.epsilon:  # return random action
+            self.qValue = np.zeros(self.actionSize)
+            return random.randrange(self.actionSize)
+        else:  # Ask action to neural net
+            self.syncActingNetwork()
+            with PROFILER.timer("act.predict"):
+                qValue = self.actingNetwork.predict(state).copy()
+            self.qValue = qValue
+            return np.argmax(qValue[0])
+
+    def calcActions(self, states):
+        '''
+        Caculates actions for a batch of states
+        All states are predicted together
+
+        returns action numbers in np.array
+        '''
+        isRandom = np.random.rand(len(states)) <= self.epsilon
+
+        if np.all(isRandom):  # No need to ask neural net
+            self.qValue = np.zeros((len(states), self.actionSize))
+            return np.random.randint(self.actionSize, size=len(states))
+
+        self.syncActingNetwork()
+        with PROFILER.timer("act.predict"):
+            qValues = self.actingNetwork.predict(states).copy()
+        actions = np.argmax(qValues, axis=1)
+
+        actions[isRandom] = np.random.randint(self.actionSize, size=np.count_nonzero(isRandom))
+        qValues[isRandom] = 0
+        self.qValue = qValues
+
+        return actions
+    
+    def appendMemory(self, state, action, reward, nextState, done, timeOut=False, envId=0):
+        '''
+        Append state to replay mem
+        With nSteps above 1 transitions go through n-step accumulator of the environment first
+        timeOut tells the episode is cut so waiting transitions are flushed
+        '''
+        if self.nSteps <= 1:
+            self.memory.append(state, action, reward, nextState, done)
+            return
+
+        accumulator = self.nStepAccumulators.get(envId)
+        if accumulator is None:
+            accumulator = NStepAccumulator(self.nSteps, self.discountFactor)
+            self.nStepAccumulators[envId] = accumulator
+
+        for transition in accumulator.push(state, action, reward, nextState, done, timeOut):
+            self.memory.append(*transition)
+
+    def resetNStep(self, envId=0):
+        '''
+        Drop waiting transitions of an episode that is abandoned
+        '''
+        if envId in self.nStepAccumulators:
+            self.nStepAccumulators[envId].clear()
+
+    def trainScheduled(self):
+        '''
+        Train model by replay ratio, called once for every step of a training loop
+        Trains gradientSteps times at every trainEvery steps once memory has learnStart transitions
+
+        return gradient updates done
+        '''
+        if not self.isTrainActive or len(self.memory) < self.learnStart:
+            return 0
+
+        self.stepsSinceTrain += 1
+        if self.stepsSinceTrain < self.trainEvery:
+            return 0
+        self.stepsSinceTrain = 0
+
+        updateCount = self.updateCount
+        for _ in range(self.gradientSteps):
+            self.trainModel()
+
+        return self.updateCount - updateCount
+
+    def trainModel(self):
+        '''
+        Train model with randomly choosen minibatches
+        Uses Double DQN, online model selects next actions and target model evaluates them
+        minibatchesPerFit minibatches are sampled together and trained with a single compiled call
+        With prioritized replay samples are weighted by importance sampling weights
+        '''
+        sampleCount = self.batchSize * self.minibatchesPerFit
+
+        # Get minibatches
+        with PROFILER.timer("train.sample"):
+            if self.prioritizedReplay:
+                states, actions, rewards, nextStates, dones, steps, indices, weights = self.memory.sample(sampleCount)
+                weights = weights.astype(np.float32)
+            else:
+                states, actions, rewards, nextStates, dones, steps = self.memory.sample(sampleCount)
+                weights = np.ones(sampleCount, dtype=np.float32)
+
+        with PROFILER.timer("train.step"):
+            loss, tdErrors, qValue = self.trainStep(states, actions, rewards, nextStates, dones, steps, weights)
+            tdErrors = tdErrors.numpy()
+        self.qValue = qValue.numpy()
+
+        if self.prioritizedReplay:
+            with PROFILER.timer("train.priorities"):
+                self.memory.updatePriorities(indices, tdErrors)
+
+        self.updateCount += self.minibatchesPerFit
+        PROFILER.count("train.updates", self.minibatchesPerFit)
+
+        self.loss = float(loss)
+
+
+def trainVectorized(agent, vecEnv, onEpisode=None, metrics=None):
+    '''
+    Training loop for vectorized environments
+    Actions for all environments are calculated with one prediction
+    Model is trained once for every vectorized step
+    onEpisode(episode, score) is called after every episode, training stops if it returns True
+    Step and episode metrics are logged to metrics if given
+    '''
+    startTime = time.time()
+    episode = agent.loadEpisodeFrom
+    totalMaxQ = np.zeros(vecEnv.envCount)
+    envSteps = 0
+    throughput = ThroughputMeter()
+    states = vecEnv.reset()
+
+    while episode < agent.episodeCount - 1:
+        stepStart = time.perf_counter()
+        actions = agent.calcActions(states)
+        maxQ = np.max(agent.qValue, axis=1)  # Taken before training overwrites qValue with the train step output
+        nextStates, rewards, dones, timeOuts = vecEnv.step(actions)
+        envTime = time.perf_counter() - stepStart
+        envSteps += vecEnv.envCount
+
+        for i in range(vecEnv.envCount):
+            agent.appendMemory(states[i], actions[i], rewards[i], nextStates[i], dones[i], timeOuts[i], i)
+
+        trainStart = time.perf_counter()
+        agent.trainScheduled()
+        trainTime = time.perf_counter() - trainStart
+
+        totalMaxQ += maxQ
+
+        if metrics is not None:
+            metrics.logStep(step=agent.stepCounter, reward=float(np.mean(rewards)), maxQ=float(np.mean(maxQ)),
+                            loss=agent.loss, epsilon=agent.epsilon, envTime=envTime, trainTime=trainTime)
+        states = vecEnv.states.copy()  # Finished environments are already reset
+
+        for i in np.flatnonzero(dones | timeOuts):
+            if episode >= agent.episodeCount - 1:
+                break  # Other environments finished in the same step than the last episode
+            episode += 1
+
+            avg_max_q = totalMaxQ[i] / vecEnv.lastEpisodeSteps[i]
+            totalMaxQ[i] = 0
+
+            # Infor user
+            m, s = divmod(int(time.time() - startTime), 60)
+            h, m = divmod(m, 60)
+
+            stepRate, updateRate = throughput.rates(envSteps, agent.updateCount)
+
+            print('Ep: {} | Env: {} | AvgMaxQVal: {:.2f} | CScore: {:.2f} | Mem: {} | Epsilon: {:.2f} | Steps/s: {:.1f} | Updates/s: {:.1f} | Time: {}:{}:{}'.format(episode, i, avg_max_q, vecEnv.lastEpisodeScores[i], len(agent.memory), agent.epsilon, stepRate, updateRate, h, m, s))
+
+            if metrics is not None:
+                metrics.logEpisode(episode=episode, score=vecEnv.lastEpisodeScores[i], avgMaxQ=avg_max_q,
+                                   steps=vecEnv.lastEpisodeSteps[i], epsilon=agent.epsilon, memory=len(agent.memory),
+                                   stepsPerSec=stepRate, updatesPerSec=updateRate, time=time.time() - startTime)
+
+            if PROFILER.enabled:
+                PROFILER.report("episode {}".format(episode), metrics)
+
+            # Save model to file
+            if agent.isTrainActive and episode % agent.saveModelAtEvery == 0:
+                agent.saveModel(episode)
+
+            # Epsilon decay
+            if agent.epsilon > agent.epsilonMin:
+                agent.epsilon *= agent.epsilonDecay
+
+            if onEpisode is not None and onEpisode(episode, vecEnv.lastEpisodeScores[i]):
+                return
+
+        agent.countStep()
+
+
+def trainEpisodes(agent, env, onEpisode=None, metrics=None):
+    '''
+    Training loop for a single environment
+    onEpisode(episode, score) is called after every episode, training stops if it returns True
+    Step and episode metrics are logged to metrics if given
+    '''
+    startTime = time.time()
+    envSteps = 0
+    throughput = ThroughputMeter()
+    for episode in range(agent.loadEpisodeFrom + 1, agent.episodeCount):
+        done = False
+        state = env.reset()
+        score = 0
+        total_max_q = 0
+
+        for step in range(1,999999):
+            stepStart = time.perf_counter()
+            action = agent.calcAction(state)
+            nextState, reward, done = env.step(action)
+            envTime = time.perf_counter() - stepStart
+            envSteps += 1
+
+            if score+reward > 10000 or score+reward < -10000:
+                print("Error Score is too high or too low! Resetting...")
+                agent.resetNStep()
+                break
+
+            agent.appendMemory(state, action, reward, nextState, done, step >= agent.timeOutLim)
+
+            trainStart = time.perf_counter()
+            agent.trainScheduled()
+            trainTime = time.perf_counter() - trainStart
+
+            score += reward
+            state = nextState
+
+            maxQ = float(np.max(agent.qValue))
+            total_max_q += maxQ
+
+            if metrics is not None:
+                metrics.logStep(step=agent.stepCounter, episode=episode, reward=reward, maxQ=maxQ, loss=agent.loss,
+                                epsilon=agent.epsilon, envTime=envTime, trainTime=trainTime)
+
+            if (step >= agent.timeOutLim):
+                print("Time out")
+                done = True
+
+            if done:
+                avg_max_q = total_max_q / step
+
+                # Infor user
+                m, s = divmod(int(time.time() - startTime), 60)
+                h, m = divmod(m, 60)
+
+                stepRate, updateRate = throughput.rates(envSteps, agent.updateCount)
+
+                print('Ep: {} | AvgMaxQVal: {:.2f} | CScore: {:.2f} | Mem: {} | Epsilon: {:.2f} | Steps/s: {:.1f} | Updates/s: {:.1f} | Time: {}:{}:{}'.format(episode, avg_max_q, score, len(agent.memory), agent.epsilon, stepRate, updateRate, h, m, s))
+
+                if metrics is not None:
+                    metrics.logEpisode(episode=episode, score=score, avgMaxQ=avg_max_q, steps=step, epsilon=agent.epsilon,
+                                       memory=len(agent.memory), stepsPerSec=stepRate, updatesPerSec=updateRate,
+                                       time=time.time() - startTime)
+
+                if PROFILER.enabled:
+                    PROFILER.report("episode {}".format(episode), metrics)
+                break
+
+            agent.countStep()
+
+        # Save model to file once the episode is over
+        if agent.isTrainActive and episode % agent.saveModelAtEvery == 0:
+            agent.saveModel(episode)
+
+        # Epsilon decay
+        if agent.epsilon > agent.epsilonMin:
+            agent.epsilon *= agent.epsilonDecay
+
+        if onEpisode is not None and onEpisode(episode, score):
+            break
+
+
+def mergeConfig(base, override):
+    '''
+    Merge override into a copy of base, nested dicts are merged key by key
+
+    return merged config in dict
+    '''
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = mergeConfig(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def setConfigValue(config, key, value):
+    '''
+    Set a config key in place, nested keys are separated with dots like agent.learningRate
+    '''
+    section = config
+    path = key.split(".")
+    for name in path[:-1]:
+        section = section.setdefault(name, {})
+    section[path[-1]] = value
+
+
+def parseValue(text):
+    '''
+    Parse a command line value as JSON, plain strings don't need quotes
+
+    return parsed value
+    '''
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parseConfig(argv):
+    '''
+    Build run configuration from DEFAULT_CONFIG, an optional JSON file and command line options
+
+    return config in dict
+    '''
+    parser = argparse.ArgumentParser(description="Train or test a DQN agent on lidar navigation")
+    parser.add_argument("--config", help="JSON file with config keys to override")
+    parser.add_argument("--robot", help="Robot profile (mantis, turtlebot3)")
+    parser.add_argument("--map", help="Maze (maze1, maze2, maze3)")
+    parser.add_argument("--headless", action="store_true", default=None, help="Use headless lidar simulator")
+    parser.add_argument("--env-count", type=int, dest="envCount", help="Headless environments stepped together")
+    parser.add_argument("--actor-count", type=int, dest="actorCount", help="Parallel actor processes")
+    parser.add_argument("--no-metrics", action="store_false", default=None, dest="metrics", help="Don't log metrics")
+    parser.add_argument("--profile", action="store_true", default=None, help="Print step phase timings after every episode")
+    parser.add_argument("--save-path", dest="savePath", help="Model save path")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override any key, nested keys with dots like agent.learningRate=0.001")
+    args = parser.parse_args(argv)
+
+    config = DEFAULT_CONFIG
+    if args.config:
+        with open(args.config) as infile:
+            config = mergeConfig(config, json.load(infile))
+
+    override = {key: getattr(args, key) for key in ("robot", "map", "headless", "envCount", "actorCount", "metrics", "profile")
+                if getattr(args, key) is not None}
+    if args.savePath is not None:
+        override["agent"] = {"savePath": args.savePath}
+    config = mergeConfig(config, override)
+
+    for item in args.set:
+        key, _, value = item.partition("=")
+        setConfigValue(config, key, parseValue(value))
+
+    return config
+
+
+def makeEnvs(config):
+    '''
+    Create environments of the config
+
+    return list of environment objects
+    '''
+    envParams = dict(config["env"], selectMap=config["map"])
+
+    if config["actorCount"] > 0:
+        # Actors own the environments, a headless one just gives the state and action sizes here
+        # Gazebo environments have the same sizes, their parameters don't apply to the headless one
+        from headless_gym_env import HeadlessGymEnv
+        if config["headless"]:
+            return [HeadlessGymEnv(**envParams)]
+        return [HeadlessGymEnv(selectMap=config["map"])]
+    elif config["headless"]:
+        from headless_gym_env import HeadlessGymEnv
+        return [HeadlessGymEnv(**envParams) for _ in range(config["envCount"])]
+    else:
+        from gazebo_dqlearn import GazeboGymEnv
+        return [GazeboGymEnv(config["robot"], **envParams)]
+
+
+def run(config, onEpisode=None):
+    '''
+    Create environments and agent of the config and train
+    Models are saved to /tmp/<robot>Model/ unless agent.savePath is given
+    onEpisode(episode, score) is called after every episode, training stops if it returns True
+
+    return agent
+    '''
+    config = mergeConfig(DEFAULT_CONFIG, config)
+    agentParams = dict(config["agent"])
+    agentParams.setdefault("savePath", "/tmp/" + config["robot"] + "Model/")
+
+    # Create environment
+    envs = makeEnvs(config)
+    env = envs[0]
+
+    # Create an agent with action and state sizes of environment
+    agent = Agent(env.stateSize, env.actionSize, agentParams)
+
+    # Load model from file if needed
+    if agent.loadModel:
+        agent.restoreModel(agent.loadEpisodeFrom)
+
+    metrics = MetricsLogger(agent.savePath + 'metrics/') if config["metrics"] else None
+    PROFILER.enable(config["profile"])
+
+    if config["actorCount"] > 0:
+        from parallel_actors import trainWithActors
+        envKind = "headless" if config["headless"] else config["robot"]
+        trainWithActors(agent, envKind, config["actorCount"], envParams=dict(config["env"], selectMap=config["map"]),
+                        onEpisode=onEpisode, metrics=metrics)
+    elif len(envs) > 1:
+        from vec_env import VecGymEnv
+        trainVectorized(agent, VecGymEnv(envs, agent.timeOutLim), onEpisode, metrics)
+    else:
+        trainEpisodes(agent, env, onEpisode, metrics)
+
+    if metrics is not None:
+        metrics.close()
+
+    return agent
+
+
+if __name__ == '__main__':
+    run(parseConfig(sys.argv[1:]))
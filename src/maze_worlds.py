@@ -0,0 +1,107 @@
+import os
+import math
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+"""
+Maze definitions shared by Gazebo and headless environments
+
+Spawn points are used both for teleporting the agent and choosing target points.
+Wall geometry is read from the Gazebo world files in ./worlds
+"""
+
+SPAWN_POINTS = {
+    "maze1": [
+        [-1.5, 0.5], [-1.5, 1.5], [-0.5, 0.5], [-0.5, 1.5],
+        [0.5, -0.5], [0.5, -1.5], [2.5, -0.5], [2.5, 0.5],
+        [5.5,-1.5], [5.5,-0.5], [5.5,0.5], [5.5,1.5]
+    ],
+    "maze2": [
+        [-1.5,-1.5], [-0.5,-1.5], [-1.5,-0.5],
+        [-0.5,1.5], [1.5,0.5],
+        [2.5,2.5], [2.5,3.5], [1.5,3.5],
+    ],
+    "maze3": [
+        [0.5,0.5], [1.5,0.5], [0.5,1.5], [1.5,1.5],
+        [-0.5,-0.5], [-1.5,-0.5], [-1.5,-1.5],
+        [0.5,-0.5], [0.5,-1.5], [1.5,-1.5],
+        [-1.5,0.5], [-0.5,1.5], [-1.5,1.5],
+    ],
+}
+
+WORLDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'worlds')
+
+
+def parsePose(poseElement):
+    '''
+    Parse an SDF pose element, only planar part is used
+
+    return x, y, yaw in tuple
+    '''
+    if poseElement is None or not poseElement.text:
+        return 0.0, 0.0, 0.0
+
+    x, y, _, _, _, yaw = [float(v) for v in poseElement.text.split()]
+    return x, y, yaw
+
+
+def composePose(parent, child):
+    '''
+    Transform a pose given in parent frame to world frame
+
+    return x, y, yaw in tuple
+    '''
+    px, py, pyaw = parent
+    cx, cy, cyaw = child
+    return (px + math.cos(pyaw) * cx - math.sin(pyaw) * cy,
+            py + math.sin(pyaw) * cx + math.cos(pyaw) * cy,
+            pyaw + cyaw)
+
+
+def loadWorldObstacles(selectMap):
+    '''
+    Read collision boxes and cylinders of a maze world as 2D shapes
+    World poses of links are taken from the saved state of the world if it exists
+
+    return wall segments as (n, 4) np.array of x1, y1, x2, y2
+    and cylinders as (m, 3) np.array of x, y, radius
+    '''
+    worldPath = os.path.join(WORLDS_DIR, selectMap + '.world')
+    world = ET.parse(worldPath).getroot().find('world')
+
+    # Link poses saved in the state section are already in world frame
+    statePoses = {}
+    for stateModel in world.findall('state/model'):
+        for stateLink in stateModel.findall('link'):
+            key = (stateModel.get('name'), stateLink.get('name'))
+            statePoses[key] = parsePose(stateLink.find('pose'))
+
+    segments = []
+    cylinders = []
+    for model in world.findall('model'):
+        modelPose = parsePose(model.find('pose'))
+        for link in model.findall('link'):
+            linkPose = statePoses.get((model.get('name'), link.get('name')))
+            if linkPose is None:
+                linkPose = composePose(modelPose, parsePose(link.find('pose')))
+
+            for collision in link.findall('collision'):
+                x, y, yaw = composePose(linkPose, parsePose(collision.find('pose')))
+                box = collision.find('geometry/box/size')
+                cylinder = collision.find('geometry/cylinder/radius')
+
+                if box is not None:
+                    sizeX, sizeY, _ = [float(v) for v in box.text.split()]
+                    cos, sin = math.cos(yaw), math.sin(yaw)
+                    corners = []
+                    for dx, dy in ((1, 1), (-1, 1), (-1, -1), (1, -1)):
+                        cornerX = dx * sizeX / 2
+                        cornerY = dy * sizeY / 2
+                        corners.append((x + cos * cornerX - sin * cornerY, y + sin * cornerX + cos * cornerY))
+                    for i in range(4):
+                        segments.append(corners[i] + corners[(i + 1) % 4])
+                elif cylinder is not None:
+                    cylinders.append((x, y, float(cylinder.text)))
+
+    return np.array(segments, dtype=np.float64).reshape(-1, 4), np.array(cylinders, dtype=np.float64).reshape(-1, 3)
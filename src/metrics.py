@@ -0,0 +1,141 @@
+import os
+import csv
+import time
+import atexit
+import threading
+
+
+class MetricsLogger():
+    '''
+    Buffers scalar metrics in memory, a background thread appends them to CSV files in batches
+    Every stream is a CSV file in logDir, columns are the keys of its first row
+    Training loops use two streams: steps.csv and episodes.csv
+    plot_metrics.py plots them while training or after it
+    '''
+    def __init__(self, logDir, flushInterval=5.0, maxBuffer=10000):
+        self.logDir = logDir
+        self.flushInterval = flushInterval  # Seconds between writes
+        self.maxBuffer = maxBuffer  # Write earlier if a stream buffers this many rows
+
+        self.buffers = {}  # Rows waiting to be written for every stream
+        self.columns = {}  # Columns of every stream, set at its first write
+        self.lock = threading.Lock()  # Guards buffers
+        self.writeLock = threading.Lock()  # Writer thread and flush may write at the same time
+        self.wake = threading.Event()
+        self.closed = False
+
+        os.makedirs(logDir, exist_ok=True)
+
+        self.thread = threading.Thread(target=self.writerLoop, daemon=True)
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def log(self, stream, **scalars):
+        '''
+        Buffer a row of a stream
+        '''
+        with self.lock:
+            buffer = self.buffers.setdefault(stream, [])
+            buffer.append(scalars)
+            if len(buffer) >= self.maxBuffer:
+                self.wake.set()
+
+    def logStep(self, **scalars):
+        self.log('steps', **scalars)
+
+    def logEpisode(self, **scalars):
+        self.log('episodes', **scalars)
+
+    def writerLoop(self):
+        '''
+        Background thread, writes buffered rows periodically until close is called
+        '''
+        while True:
+            self.wake.wait(self.flushInterval)
+            self.wake.clear()
+            try:
+                self.write()
+            except Exception as e:
+                print("Error while writing metrics", e)
+            if self.closed:
+                return
+
+    def write(self):
+        '''
+        Append buffered rows to CSV files
+        A file left by an earlier run with the same columns is continued, otherwise it is replaced
+        '''
+        with self.writeLock:
+            with self.lock:
+                buffers, self.buffers = self.buffers, {}
+
+            for stream, rows in buffers.items():
+                path = os.path.join(self.logDir, stream + '.csv')
+                columns = self.columns.get(stream)
+                writeHeader = False
+
+                if columns is None:
+                    columns = list(rows[0])
+                    self.columns[stream] = columns
+                    writeHeader = self.readHeader(path) != columns
+
+                with open(path, 'w' if writeHeader else 'a', newline='') as outfile:
+                    writer = csv.DictWriter(outfile, columns, extrasaction='ignore')
+                    if writeHeader:
+                        writer.writeheader()
+                    writer.writerows(rows)
+
+    def readHeader(self, path):
+        '''
+        return columns of an existing CSV file or None
+        '''
+        if not os.path.exists(path):
+            return None
+        with open(path, newline='') as infile:
+            return next(csv.reader(infile), None)
+
+    def flush(self):
+        '''
+        Write buffered rows now
+        '''
+        self.write()
+
+    def close(self):
+        '''
+        Write buffered rows and stop writer thread
+        '''
+        if not self.closed:
+            self.closed = True
+            self.wake.set()
+            self.thread.join()
+
+
+class ThroughputMeter():
+    '''
+    Env steps and gradient updates per second between calls
+    Rates are measured over at least minInterval seconds, earlier calls return the last rates
+    '''
+    def __init__(self, minInterval=1.0):
+        self.minInterval = minInterval
+        self.lastTime = time.perf_counter()
+        self.lastSteps = 0
+        self.lastUpdates = 0
+        self.stepRate = 0.0
+        self.updateRate = 0.0
+
+    def rates(self, envSteps, updates):
+        '''
+        envSteps and updates are totals since training started
+
+        return env steps per second and updates per second
+        '''
+        now = time.perf_counter()
+        elapsed = now - self.lastTime
+        if elapsed >= self.minInterval:
+            self.stepRate = (envSteps - self.lastSteps) / elapsed
+            self.updateRate = (updates - self.lastUpdates) / elapsed
+            self.lastTime = now
+            self.lastSteps = envSteps
+            self.lastUpdates = updates
+        return self.stepRate, self.updateRate
@@ -0,0 +1,131 @@
+import sys
+
+import numpy as np
+
+"""
+NumPy inference for the Q network
+
+Agent.initNetwork builds a small Dense relu network, Keras call overhead is much bigger
+than the network itself when one state is predicted. NumpyQNetwork runs the same forward pass
+with float32 numpy arrays and preallocated buffers, so acting doesn't need TensorFlow.
+
+Weight files are .npz files with weight0, weight1, ... arrays (kernel, bias pairs).
+Checkpoints written by CheckpointManager can be loaded directly, .h5 models have to be exported:
+
+python3 numpy_qnet.py /tmp/mantisModel/8262.h5 /tmp/mantisModel/8262.qnet.npz
+"""
+
+
+class NumpyQNetwork():
+    '''
+    Forward pass of the Dense relu network built by Agent.initNetwork
+    Weights come as kernel, bias pairs like Keras get_weights, dropout is not used while acting
+    '''
+    def __init__(self, weights, maxBatch=1):
+        self.kernels = [np.array(w, dtype=np.float32) for w in weights[0::2]]
+        self.biases = [np.array(w, dtype=np.float32) for w in weights[1::2]]
+        self.stateSize = self.kernels[0].shape[0]
+        self.actionSize = self.kernels[-1].shape[1]
+        self.allocate(maxBatch)
+
+    def allocate(self, maxBatch):
+        '''
+        Preallocate input and layer output buffers for batches up to maxBatch states
+        '''
+        self.maxBatch = maxBatch
+        self.inputBuffer = np.empty((maxBatch, self.stateSize), dtype=np.float32)
+        self.buffers = [np.empty((maxBatch, kernel.shape[1]), dtype=np.float32) for kernel in self.kernels]
+
+    def setWeights(self, weights):
+        '''
+        Copy new weights into the existing arrays
+        '''
+        for kernel, w in zip(self.kernels, weights[0::2]):
+            np.copyto(kernel, w, casting='same_kind')
+        for bias, w in zip(self.biases, weights[1::2]):
+            np.copyto(bias, w, casting='same_kind')
+
+    def getWeights(self):
+        '''
+        return weights as kernel, bias pairs like Keras get_weights
+        '''
+        return [w for pair in zip(self.kernels, self.biases) for w in pair]
+
+    def predict(self, states):
+        '''
+        Calculate q values of a state or a batch of states
+        Returned array is a buffer that is overwritten by the next call
+
+        return q values in np.array shaped (batch, actionSize)
+        '''
+        states = np.asarray(states)
+        if states.ndim == 1:
+            states = states.reshape(1, -1)
+
+        count = len(states)
+        if count > self.maxBatch:
+            self.allocate(count)
+
+        x = self.inputBuffer[:count]
+        np.copyto(x, states, casting='same_kind')
+
+        lastLayer = len(self.kernels) - 1
+        for i, (kernel, bias) in enumerate(zip(self.kernels, self.biases)):
+            out = self.buffers[i][:count]
+            np.matmul(x, kernel, out=out)
+            out += bias
+            if i < lastLayer:
+                np.maximum(out, 0, out=out)
+            x = out
+
+        return x
+
+    def calcAction(self, state):
+        '''
+        Greedy action of a single state
+
+        return action number in int
+        '''
+        return int(np.argmax(self.predict(state)[0]))
+
+
+def saveWeights(weights, path):
+    '''
+    Save kernel, bias pairs as float32 arrays
+    '''
+    np.savez(path, **{'weight{}'.format(i): np.asarray(w, dtype=np.float32) for i, w in enumerate(weights)})
+
+
+def loadWeights(path):
+    '''
+    Load weights saved by saveWeights or CheckpointManager
+
+    return weights in list of np.array
+    '''
+    with np.load(path) as data:
+        weightCount = sum(name.startswith('weight') for name in data.files)
+        return [data['weight{}'.format(i)] for i in range(weightCount)]
+
+
+def loadNumpyQNetwork(path, maxBatch=1):
+    '''
+    return NumpyQNetwork with weights of given file
+    '''
+    return NumpyQNetwork(loadWeights(path), maxBatch)
+
+
+def exportModel(modelPath, path):
+    '''
+    Export weights of a Keras model file saved by the agent
+    '''
+    from keras.models import load_model
+
+    saveWeights(load_model(modelPath).get_weights(), path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python3 numpy_qnet.py model.h5 weights.npz")
+        sys.exit(1)
+
+    exportModel(sys.argv[1], sys.argv[2])
@@ -0,0 +1,59 @@
+"""
+Save and restore optimizer state of a Keras model through public APIs only
+Keras 2.4 optimizers list their variables with variables(), Keras 3 and tf.keras 2.11+ have a variables list.
+Slots are created with build where it exists, older optimizers create them at one apply_gradients of zeros.
+"""
+
+
+def optimizerVariables(optimizer):
+    '''
+    return list of optimizer variables, iteration count first and then slots
+    '''
+    variables = getattr(optimizer, 'variables', None)
+    if callable(variables):
+        variables = variables()
+    if variables is None:
+        raise RuntimeError("Optimizer {} doesn't expose its variables, its state can't be saved or restored".format(
+            type(optimizer).__name__))
+    return list(variables)
+
+
+def getOptimizerWeights(optimizer):
+    '''
+    return list of np.array with values of optimizer variables
+    '''
+    return [variable.numpy() for variable in optimizerVariables(optimizer)]
+
+
+def buildOptimizer(optimizer, trainableVariables):
+    '''
+    Create slots of an optimizer that hasn't applied any gradients yet
+    Zero gradients don't move RMSprop and Adam variables, restored values overwrite the slots anyway
+    '''
+    if hasattr(optimizer, 'build'):
+        optimizer.build(trainableVariables)
+    else:
+        import tensorflow as tf
+        optimizer.apply_gradients([(tf.zeros_like(variable), variable) for variable in trainableVariables])
+
+
+def setOptimizerWeights(optimizer, trainableVariables, weights):
+    '''
+    Assign saved values to optimizer variables, slots are created first if needed
+    '''
+    variables = optimizerVariables(optimizer)
+    if len(variables) != len(weights) and not getattr(optimizer, 'built', False):
+        buildOptimizer(optimizer, trainableVariables)
+        variables = optimizerVariables(optimizer)
+
+    if len(variables) != len(weights):
+        raise ValueError("Checkpoint has {} optimizer weights, optimizer {} has {}. "
+                         "Was it saved with another Keras version or optimizer?".format(
+                             len(weights), type(optimizer).__name__, len(variables)))
+
+    for variable, weight in zip(variables, weights):
+        if tuple(variable.shape) != tuple(weight.shape):
+            raise ValueError("Optimizer weight {} has shape {}, checkpoint has {}".format(
+                variable.name, tuple(variable.shape), tuple(weight.shape)))
+    for variable, weight in zip(variables, weights):
+        variable.assign(weight)
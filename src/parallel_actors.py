@@ -0,0 +1,348 @@
+import os
+import time
+import queue
+import multiprocessing as mp
+
+import numpy as np
+
+from numpy_qnet import NumpyQNetwork
+from replay_memory import NStepAccumulator
+from profiling import PROFILER
+from metrics import ThroughputMeter
+
+"""
+Parallel actors with a shared learner
+
+Every actor process owns an environment and acts with a numpy copy of the online model.
+Transitions are written to a shared memory ring buffer per actor, the learner copies
+them in bulk into its replay memory, trains and publishes new weights to shared memory.
+
+Gazebo actors need their own ROS master and Gazebo server. Actor i connects to
+ROS master at port ROS_MASTER_BASE_PORT + i and Gazebo master at GAZEBO_MASTER_BASE_PORT + i.
+Launch simulations with something like:
+ROS_MASTER_URI=http://localhost:11312 GAZEBO_MASTER_URI=http://localhost:11346 roslaunch -p 11312 mantis_ddqn_navigation gazebo_mantis_maze1.launch
+"""
+ROS_MASTER_BASE_PORT = 11311
+GAZEBO_MASTER_BASE_PORT = 11345
+
+
+def makeEnv(envKind, actorId, envParams=None):
+    '''
+    Create an environment inside an actor process
+    envKind is headless or a robot of ROBOT_PROFILES, envParams are passed to the environment class
+    Gazebo environments are connected to the ROS and Gazebo masters of this actor
+
+    return environment object
+    '''
+    envParams = envParams or {}
+    if envKind == "headless":
+        from headless_gym_env import HeadlessGymEnv
+        return HeadlessGymEnv(**envParams)
+
+    os.environ["ROS_MASTER_URI"] = "http://localhost:" + str(ROS_MASTER_BASE_PORT + actorId)
+    os.environ["GAZEBO_MASTER_URI"] = "http://localhost:" + str(GAZEBO_MASTER_BASE_PORT + actorId)
+
+    from gazebo_dqlearn import GazeboGymEnv
+    return GazeboGymEnv(envKind, **envParams)
+
+
+class SharedWeights():
+    '''
+    Model weights in one shared memory block
+    Learner publishes, actors pull when the version changes
+    '''
+    def __init__(self, shapes, ctx):
+        self.shapes = [tuple(shape) for shape in shapes]
+        self.sizes = [int(np.prod(shape)) for shape in self.shapes]
+        self.buffer = ctx.RawArray('f', sum(self.sizes))
+        self.version = ctx.Value('q', 0)  # Its lock also guards the buffer
+
+    def publish(self, weights):
+        '''
+        Copy weights into shared memory
+        '''
+        flat = np.frombuffer(self.buffer, dtype=np.float32)
+        with self.version.get_lock():
+            offset = 0
+            for weight, size in zip(weights, self.sizes):
+                flat[offset:offset + size] = np.ravel(weight)
+                offset += size
+            self.version.value += 1
+
+    def pull(self, lastVersion):
+        '''
+        Copy weights from shared memory if they are newer than lastVersion
+
+        return version and list of np.array weights (None if not changed)
+        '''
+        if self.version.value == lastVersion:
+            return lastVersion, None
+
+        flat = np.frombuffer(self.buffer, dtype=np.float32)
+        with self.version.get_lock():
+            version = self.version.value
+            weights = []
+            offset = 0
+            for shape, size in zip(self.shapes, self.sizes):
+                weights.append(flat[offset:offset + size].reshape(shape).copy())
+                offset += size
+
+        return version, weights
+
+
+class TransitionRing():
+    '''
+    Single producer single consumer ring buffer of transitions in shared memory
+    Actor writes one transition at a time, learner drains everything at once
+    '''
+    def __init__(self, capacity, stateSize, ctx):
+        self.capacity = capacity
+        self.stateSize = stateSize
+        self.stateBuffer = ctx.RawArray('f', capacity * stateSize)
+        self.nextStateBuffer = ctx.RawArray('f', capacity * stateSize)
+        self.actionBuffer = ctx.RawArray('q', capacity)
+        self.rewardBuffer = ctx.RawArray('f', capacity)
+        self.doneBuffer = ctx.RawArray('b', capacity)
+        self.stepsBuffer = ctx.RawArray('h', capacity)
+        self.writeCount = ctx.Value('q', 0)
+        self.readCount = ctx.Value('q', 0)
+        self.attachArrays()
+
+    def attachArrays(self):
+        '''
+        Create numpy views of shared buffers
+        '''
+        self.states = np.frombuffer(self.stateBuffer, dtype=np.float32).reshape(self.capacity, self.stateSize)
+        self.nextStates = np.frombuffer(self.nextStateBuffer, dtype=np.float32).reshape(self.capacity, self.stateSize)
+        self.actions = np.frombuffer(self.actionBuffer, dtype=np.int64)
+        self.rewards = np.frombuffer(self.rewardBuffer, dtype=np.float32)
+        self.dones = np.frombuffer(self.doneBuffer, dtype=np.int8)
+        self.steps = np.frombuffer(self.stepsBuffer, dtype=np.int16)
+
+    def __getstate__(self):
+        # Numpy views can't be pickled to a child process, they are created again
+        state = self.__dict__.copy()
+        for name in ('states', 'nextStates', 'actions', 'rewards', 'dones', 'steps'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attachArrays()
+
+    def put(self, state, action, reward, nextState, done, steps, stopEvent):
+        '''
+        Write a transition, waits while the ring is full
+
+        return False if stopped while waiting
+        '''
+        while self.writeCount.value - self.readCount.value >= self.capacity:
+            if stopEvent.is_set():
+                return False
+            time.sleep(0.001)
+
+        index = self.writeCount.value % self.capacity
+        self.states[index] = state
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.nextStates[index] = nextState
+        self.dones[index] = done
+        self.steps[index] = steps
+
+        with self.writeCount.get_lock():
+            self.writeCount.value += 1
+
+        return True
+
+    def drainTo(self, memory):
+        '''
+        Move all written transitions to replay memory
+
+        return moved transition count
+        '''
+        start = self.readCount.value
+        end = self.writeCount.value
+
+        if end > start:
+            indices = np.arange(start, end) % self.capacity
+            memory.appendBatch(self.states[indices], self.actions[indices], self.rewards[indices],
+                               self.nextStates[indices], self.dones[indices].astype(bool), self.steps[indices])
+
+        with self.readCount.get_lock():
+            self.readCount.value = end
+
+        return end - start
+
+
+def actorProcess(actorId, envKind, ring, sharedWeights, epsilon, episodeQueue, stopEvent, timeOutLim, weightSyncEvery,
+                 envParams=None, nSteps=1, discountFactor=0.99):
+    '''
+    Main loop of an actor process
+    Acts epsilon greedy with the latest published weights and reports finished episodes
+    Transitions are turned to n-step transitions here when nSteps is above 1
+    '''
+    np.random.seed()  # Every actor needs its own random stream
+    env = makeEnv(envKind, actorId, envParams)
+    version, weights = sharedWeights.pull(-1)
+    network = NumpyQNetwork(weights)
+    accumulator = NStepAccumulator(nSteps, discountFactor)
+
+    stepCounter = 0
+    while not stopEvent.is_set():
+        state = env.reset()
+        score = 0
+        accumulator.clear()
+
+        for step in range(1, timeOutLim + 1):
+            if np.random.rand() <= epsilon.value:
+                action = np.random.randint(env.actionSize)
+            else:
+                action = network.calcAction(state)
+
+            nextState, reward, done = env.step(action)
+
+            for transition in accumulator.push(state, action, reward, nextState, done, step == timeOutLim):
+                if not ring.put(*transition, stopEvent):
+                    return
+
+            score += reward
+            state = nextState
+
+            stepCounter += 1
+            if stepCounter % weightSyncEvery == 0:
+                version, newWeights = sharedWeights.pull(version)
+                if newWeights is not None:
+                    network.setWeights(newWeights)
+
+            if done or stopEvent.is_set():
+                break
+
+        episodeQueue.put((actorId, score, step))
+
+
+class ParallelActors():
+    '''
+    Starts and stops actor processes
+    '''
+    def __init__(self, actorCount, envKind, stateSize, weights, timeOutLim, ringSize=10000, weightSyncEvery=100,
+                 envParams=None, nSteps=1, discountFactor=0.99):
+        ctx = mp.get_context('spawn')  # Don't fork the learner's TensorFlow state
+
+        self.actorCount = actorCount
+        self.sharedWeights = SharedWeights([np.shape(weight) for weight in weights], ctx)
+        self.sharedWeights.publish(weights)
+        self.epsilon = ctx.Value('d', 1.0)
+        self.episodeQueue = ctx.Queue()
+        self.stopEvent = ctx.Event()
+        self.rings = [TransitionRing(ringSize, stateSize, ctx) for _ in range(actorCount)]
+
+        self.processes = []
+        for actorId in range(actorCount):
+            process = ctx.Process(target=actorProcess, daemon=True, args=(
+                actorId, envKind, self.rings[actorId], self.sharedWeights, self.epsilon,
+                self.episodeQueue, self.stopEvent, timeOutLim, weightSyncEvery, envParams, nSteps, discountFactor))
+            self.processes.append(process)
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def stop(self):
+        self.stopEvent.set()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def drainTo(self, memory):
+        '''
+        Move transitions of all actors to replay memory
+
+        return moved transition count
+        '''
+        return sum(ring.drainTo(memory) for ring in self.rings)
+
+    def finishedEpisodes(self):
+        '''
+        return list of (actorId, score, stepCount) of episodes finished since last call
+        '''
+        episodes = []
+        while True:
+            try:
+                episodes.append(self.episodeQueue.get_nowait())
+            except queue.Empty:
+                return episodes
+
+
+def trainWithActors(agent, envKind, actorCount, weightPublishEvery=100, envParams=None, onEpisode=None, metrics=None):
+    '''
+    Learner loop
+    Collects transitions from actors, trains the agent and publishes its weights
+    onEpisode(episode, score) is called after every episode, training stops if it returns True
+    Train step and episode metrics are logged to metrics if given
+    '''
+    agent.copyActingNetwork()
+    actors = ParallelActors(actorCount, envKind, agent.stateSize, agent.actingNetwork.getWeights(), agent.timeOutLim,
+                            envParams=envParams, nSteps=agent.nSteps, discountFactor=agent.discountFactor)
+    actors.epsilon.value = agent.epsilon
+    actors.start()
+
+    startTime = time.time()
+    episode = agent.loadEpisodeFrom
+    envSteps = 0
+    throughput = ThroughputMeter()
+
+    try:
+        while episode < agent.episodeCount - 1:
+            with PROFILER.timer("learner.drain"):
+                collected = actors.drainTo(agent.memory)
+            envSteps += collected
+
+            for actorId, score, stepCount in actors.finishedEpisodes():
+                if episode >= agent.episodeCount - 1:
+                    break  # Episodes finished while the learner was busy, e.g. tracing the first train step
+                episode += 1
+
+                # Infor user
+                m, s = divmod(int(time.time() - startTime), 60)
+                h, m = divmod(m, 60)
+
+                stepRate, updateRate = throughput.rates(envSteps, agent.updateCount)
+
+                print('Ep: {} | Actor: {} | Steps: {} | CScore: {:.2f} | Mem: {} | Epsilon: {:.2f} | Steps/s: {:.1f} | Updates/s: {:.1f} | Time: {}:{}:{}'.format(episode, actorId, stepCount, score, len(agent.memory), agent.epsilon, stepRate, updateRate, h, m, s))
+
+                if metrics is not None:
+                    metrics.logEpisode(episode=episode, actor=actorId, score=score, steps=stepCount, epsilon=agent.epsilon,
+                                       memory=len(agent.memory), stepsPerSec=stepRate, updatesPerSec=updateRate,
+                                       time=time.time() - startTime)
+
+                if PROFILER.enabled:
+                    PROFILER.report("episode {}".format(episode), metrics)
+
+                # Save model to file
+                if agent.isTrainActive and episode % agent.saveModelAtEvery == 0:
+                    agent.saveModel(episode)
+
+                # Epsilon decay
+                if agent.epsilon > agent.epsilonMin:
+                    agent.epsilon *= agent.epsilonDecay
+                actors.epsilon.value = agent.epsilon
+
+                if onEpisode is not None and onEpisode(episode, score):
+                    return
+
+            if agent.isTrainActive and len(agent.memory) >= agent.learnStart:
+                trainStart = time.perf_counter()
+                agent.trainScheduled()
+
+                if metrics is not None:
+                    metrics.logStep(step=agent.stepCounter, collected=collected, loss=agent.loss, epsilon=agent.epsilon,
+                                    trainTime=time.perf_counter() - trainStart)
+
+                agent.countStep()
+                if agent.stepCounter % weightPublishEvery == 0:
+                    actors.sharedWeights.publish(agent.onlineModel.get_weights())
+            elif collected == 0:
+                time.sleep(0.01)
+    finally:
+        actors.stop()
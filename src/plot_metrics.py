@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import csv
+import argparse
+
+import numpy as np
+
+"""
+Plots metrics logged by MetricsLogger while training or after it
+Training process doesn't draw anything, this script reads the CSV files in another process.
+
+Usage: python3 plot_metrics.py /tmp/mantisModel/metrics/ [--follow SECONDS] [--window EPISODES]
+"""
+
+
+def readColumns(path):
+    '''
+    Read a CSV file written by MetricsLogger, empty cells are nan
+
+    return dict of column name to np.array, empty if file doesn't exist
+    '''
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, newline='') as infile:
+        reader = csv.reader(infile)
+        header = next(reader, None)
+        if header is None:
+            return {}
+        rows = [row for row in reader if len(row) == len(header)]  # Last row may be half written
+
+    columns = {}
+    for i, name in enumerate(header):
+        try:
+            columns[name] = np.array([float(row[i]) if row[i] != '' else np.nan for row in rows])
+        except ValueError:
+            pass  # Not a scalar column
+    return columns
+
+
+def rollingMean(values, window):
+    '''
+    return mean of the last window values for every index
+    '''
+    if len(values) == 0:
+        return values
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return (cumsum[1:] - cumsum[np.arange(1, len(values) + 1) - counts]) / counts
+
+
+def plotMetrics(plt, metricsDir, window):
+    '''
+    Draw score, average max Q, epsilon and loss to the current figure
+    '''
+    episodes = readColumns(os.path.join(metricsDir, 'episodes.csv'))
+    steps = readColumns(os.path.join(metricsDir, 'steps.csv'))
+
+    plt.clf()
+    axes = plt.gcf().subplots(2, 2)
+
+    if 'episode' in episodes:
+        x = episodes['episode']
+        axes[0][0].plot(x, episodes['score'], alpha=0.4, label='Score')
+        axes[0][0].plot(x, rollingMean(episodes['score'], window), label='Mean of last {}'.format(window))
+        axes[0][0].legend()
+        if 'avgMaxQ' in episodes:
+            axes[0][1].plot(x, episodes['avgMaxQ'])
+        axes[1][0].plot(x, episodes['epsilon'])
+
+    if 'loss' in steps:
+        valid = ~np.isnan(steps['loss'])
+        axes[1][1].plot(steps['step'][valid], steps['loss'][valid], alpha=0.4)
+        axes[1][1].plot(steps['step'][valid], rollingMean(steps['loss'][valid], window * 10))
+        axes[1][1].set_yscale('log')
+
+    for ax, xTitle, yTitle in zip(axes.flat, ['Episode', 'Episode', 'Episode', 'Step'],
+                                  ['Score', 'Avg Max Q Val', 'Epsilon', 'Loss']):
+        ax.set_xlabel(xTitle, fontsize=13)
+        ax.set_ylabel(yTitle, fontsize=13)
+
+    plt.tight_layout()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Plot training metrics")
+    parser.add_argument("metricsDir", help="Metrics directory of a run, savePath/metrics/")
+    parser.add_argument("--follow", type=float, default=None, help="Redraw every this many seconds")
+    parser.add_argument("--window", type=int, default=100, help="Episodes in rolling mean")
+    parser.add_argument("--output", default=None, help="Save figure to file instead of showing it")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.metricsDir):
+        print("No metrics directory " + args.metricsDir)
+        sys.exit(1)
+
+    if args.output is not None:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.style.use('Solarize_Light2')
+    plt.figure(0, figsize=(12, 8))
+
+    if args.output is not None:
+        plotMetrics(plt, args.metricsDir, args.window)
+        plt.savefig(args.output)
+    elif args.follow is None:
+        plotMetrics(plt, args.metricsDir, args.window)
+        plt.show()
+    else:
+        while plt.fignum_exists(0):
+            plotMetrics(plt, args.metricsDir, args.window)
+            plt.pause(args.follow)
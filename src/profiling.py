@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+
+"""
+Opt-in timers and counters for hot paths
+Code wraps its phases with PROFILER.timer(name) and counts events with PROFILER.count(name).
+Nothing is recorded until PROFILER.enable() is called, a disabled timer is a shared object
+whose enter and exit do nothing so instrumented code runs at full speed.
+Training loops print a percentile table of every timer after each episode.
+Every process has its own PROFILER, parallel actor processes are never profiled.
+"""
+PERCENTILES = (50, 95, 99)
+
+
+class Timer():
+    '''
+    Context manager appending its elapsed time to a list of samples
+    '''
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer():
+    '''
+    Timer of a disabled profiler
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Profiler():
+    '''
+    Named timers and counters collected until the next report
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.samples = {}  # Seconds of every timer name since last reset
+        self.timers = {}  # One reused Timer for every name
+        self.counters = {}  # Count of every counter name since last reset
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        self.reset()
+
+    def timer(self, name):
+        '''
+        return context manager timing its block under name
+        '''
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = Timer(self.samples.setdefault(name, []))
+            self.timers[name] = timer
+        return timer
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        '''
+        return dict of timer name to dict of count, total and percentiles in seconds,
+        and dict of counters
+        '''
+        timers = {}
+        for name, samples in self.samples.items():
+            if samples:
+                values = np.percentile(samples, PERCENTILES)
+                stats = {'count': len(samples), 'total': float(np.sum(samples)), 'mean': float(np.mean(samples))}
+                stats.update(('p{}'.format(p), float(value)) for p, value in zip(PERCENTILES, values))
+                timers[name] = stats
+        return timers, dict(self.counters)
+
+    def reset(self):
+        '''
+        Clear samples and counters, timers keep their lists
+        '''
+        for samples in self.samples.values():
+            del samples[:]
+        self.counters.clear()
+
+    def report(self, title, metrics=None):
+        '''
+        Print percentile table of timers and counters then reset
+        Rows are also logged to 'profile' stream of metrics if given
+        '''
+        timers, counters = self.summary()
+        self.reset()
+        if not timers and not counters:
+            return
+
+        print('Profile of {}'.format(title))
+        print('  {:<20} {:>7} {:>10} {:>10} {:>10} {:>10} {:>10}'.format('timer', 'count', 'total ms', 'mean ms',
+                                                                     'p50 ms', 'p95 ms', 'p99 ms'))
+        for name in sorted(timers):
+            stats = timers[name]
+            print('  {:<20} {:>7} {:>10.1f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                name, stats['count'], stats['total'] * 1000, stats['mean'] * 1000,
+                stats['p50'] * 1000, stats['p95'] * 1000, stats['p99'] * 1000))
+            if metrics is not None:
+                metrics.log('profile', title=title, name=name, **stats)
+        for name in sorted(counters):
+            print('  {:<20} {:>7}'.format(name, counters[name]))
+
+
+PROFILER = Profiler()
@@ -0,0 +1,462 @@
+import os
+import json
+from collections import deque
+
+import numpy as np
+
+ROW_ARRAYS = ('states', 'actions', 'rewards', 'nextStates', 'dones', 'steps')  # Arrays with one row per transition
+
+
+class ReplayMemory():
+    '''
+    Replay memory for the agent
+    Transitions are kept in preallocated numpy arrays that are used as a ring buffer
+    When memory is full the oldest transitions are overwritten
+    steps of a transition is how many rewards are summed in it, next state is that many steps later
+    '''
+    def __init__(self, capacity, stateSize, dtype=np.float32):
+        self.capacity = capacity  # Maximum transition count
+        self.stateSize = stateSize  # Size of one state
+
+        self.states = np.zeros((capacity, stateSize), dtype=dtype)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.nextStates = np.zeros((capacity, stateSize), dtype=dtype)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.steps = np.ones(capacity, dtype=np.int16)
+
+        self.index = 0  # Next write position in arrays
+        self.size = 0  # Filled transition count
+        self.appendCount = 0  # Total appended transitions, snapshots only save what is new since the last one
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, nextState, done, steps=1):
+        '''
+        Append a transition to memory
+        '''
+        self.states[self.index] = state
+        self.actions[self.index] = action
+        self.rewards[self.index] = reward
+        self.nextStates[self.index] = nextState
+        self.dones[self.index] = done
+        self.steps[self.index] = steps
+
+        self.index = (self.index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.appendCount += 1
+
+    def appendBatch(self, states, actions, rewards, nextStates, dones, steps=1):
+        '''
+        Append many transitions at once
+        '''
+        count = len(actions)
+        indices = (self.index + np.arange(count)) % self.capacity
+
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.nextStates[indices] = nextStates
+        self.dones[indices] = dones
+        self.steps[indices] = steps
+
+        self.index = (self.index + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        self.appendCount += count
+
+    def sampleIndices(self, batchSize):
+        '''
+        Choose random transition indices
+        Indices are drawn with replacement, duplicates are rare for big memories
+
+        return indices in np.array
+        '''
+        return np.random.randint(0, self.size, size=batchSize)
+
+    def getBatch(self, indices):
+        '''
+        Gather transitions at given indices
+
+        return states, actions, rewards, nextStates, dones, steps in np.array
+        '''
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.nextStates[indices], self.dones[indices], self.steps[indices])
+
+    def sample(self, batchSize):
+        '''
+        Sample a random minibatch
+
+        return states, actions, rewards, nextStates, dones, steps in np.array
+        '''
+        return self.getBatch(self.sampleIndices(batchSize))
+
+    def collectSnapshot(self, savedCount):
+        '''
+        Copy transitions appended since the snapshot taken at savedCount appends
+        Only copies new rows so it is cheap enough for the training thread
+
+        return dict with positions of new rows, rows, arrays saved as a whole and meta data
+        '''
+        count = min(self.appendCount - savedCount, self.capacity)
+        positions = (self.index - count + np.arange(count)) % self.capacity
+
+        return {
+            'positions': positions,
+            'rows': {name: getattr(self, name)[positions] for name in ROW_ARRAYS},
+            'whole': {},
+            'meta': {'capacity': self.capacity, 'stateSize': self.stateSize, 'index': self.index,
+                     'size': self.size, 'appendCount': self.appendCount}
+        }
+
+    def restoreSnapshot(self, arrays, meta):
+        '''
+        Fill memory from saved arrays and meta data
+        '''
+        if meta['capacity'] != self.capacity or meta['stateSize'] != self.stateSize:
+            raise ValueError("Saved memory has capacity {} and state size {}, memory has {} and {}".format(
+                meta['capacity'], meta['stateSize'], self.capacity, self.stateSize))
+
+        for name in ROW_ARRAYS:
+            if name == 'steps' and name not in arrays:
+                self.steps[:] = 1  # Saved before n-step returns, every transition is a single step
+            else:
+                getattr(self, name)[:] = arrays[name]
+
+        self.index = meta['index']
+        self.size = meta['size']
+        self.appendCount = meta['appendCount']
+
+
+class SumTree():
+    '''
+    Binary tree where every node keeps the sum of its children
+    Leaves keep priorities so proportional sampling and priority updates cost O(log n)
+    Tree is stored in a flat array, root is at index 1 and children of node i are 2i and 2i+1
+    '''
+    def __init__(self, capacity):
+        self.leafCount = 1  # Leaf count is rounded up to a power of two
+        self.depth = 0
+        while self.leafCount < capacity:
+            self.leafCount *= 2
+            self.depth += 1
+
+        self.tree = np.zeros(2 * self.leafCount, dtype=np.float64)
+
+    def total(self):
+        '''
+        return sum of all priorities in float
+        '''
+        return self.tree[1]
+
+    def get(self, indices):
+        '''
+        return priorities of given leaf indices in np.array
+        '''
+        return self.tree[np.asarray(indices) + self.leafCount]
+
+    def updateOne(self, index, priority):
+        '''
+        Set priority of a single leaf and refresh its parents
+        '''
+        node = index + self.leafCount
+        self.tree[node] = priority
+        node //= 2
+        while node >= 1:
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+            node //= 2
+
+    def update(self, indices, priorities):
+        '''
+        Set priorities of a batch of leaves and refresh their parents level by level
+        '''
+        nodes = np.asarray(indices, dtype=np.int64) + self.leafCount
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        '''
+        Find leaves whose cumulative priority range contains the given values
+        Whole batch walks down the tree together
+
+        return leaf indices in np.array
+        '''
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            leftSums = self.tree[left]
+            goRight = values >= leftSums
+            values = np.where(goRight, values - leftSums, values)
+            nodes = np.where(goRight, left + 1, left)
+
+        return nodes - self.leafCount
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    '''
+    Proportional prioritized replay memory
+    Transitions are sampled with probability p^alpha / sum(p^alpha) where p is the last TD error
+    Importance sampling weights correct the bias, beta is annealed to 1 while sampling
+    '''
+    def __init__(self, capacity, stateSize, alpha=0.6, beta=0.4, betaIncrement=0.000001, dtype=np.float32):
+        super().__init__(capacity, stateSize, dtype)
+        self.alpha = alpha  # How much prioritization is used, 0 means uniform sampling
+        self.beta = beta  # Importance sampling correction amount
+        self.betaIncrement = betaIncrement  # Beta is increased by this value at every sample
+        self.priorityEpsilon = 1e-6  # Keeps priorities of zero error transitions above zero
+        self.maxPriority = 1.0  # New transitions get the highest priority seen so far
+
+        self.tree = SumTree(capacity)
+
+    def append(self, state, action, reward, nextState, done, steps=1):
+        '''
+        Append a transition to memory with max priority
+        '''
+        self.tree.updateOne(self.index, self.maxPriority ** self.alpha)
+        super().append(state, action, reward, nextState, done, steps)
+
+    def appendBatch(self, states, actions, rewards, nextStates, dones, steps=1):
+        '''
+        Append many transitions at once with max priority
+        '''
+        indices = (self.index + np.arange(len(actions))) % self.capacity
+        self.tree.update(indices, np.full(len(indices), self.maxPriority ** self.alpha))
+        super().appendBatch(states, actions, rewards, nextStates, dones, steps)
+
+    def sampleIndices(self, batchSize):
+        '''
+        Choose transition indices proportional to their priorities
+        Priority range is split into equal segments and one index is drawn from each
+
+        return indices in np.array
+        '''
+        segment = self.tree.total() / batchSize
+        values = (np.arange(batchSize) + np.random.rand(batchSize)) * segment
+        indices = self.tree.find(values)
+
+        # Floating point errors may point to an empty leaf at the end
+        return np.minimum(indices, self.size - 1)
+
+    def sample(self, batchSize):
+        '''
+        Sample a prioritized minibatch
+
+        return states, actions, rewards, nextStates, dones, steps, indices, weights in np.array
+        '''
+        indices = self.sampleIndices(batchSize)
+
+        probs = self.tree.get(indices) / self.tree.total()
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.betaIncrement)
+
+        return self.getBatch(indices) + (indices, weights.astype(np.float32))
+
+    def updatePriorities(self, indices, tdErrors):
+        '''
+        Update priorities of sampled transitions with their new TD errors
+        '''
+        priorities = np.abs(tdErrors) + self.priorityEpsilon
+        self.maxPriority = max(self.maxPriority, float(priorities.max()))  # Plain float, it goes to json meta
+        self.tree.update(indices, priorities ** self.alpha)
+
+    def collectSnapshot(self, savedCount):
+        '''
+        Same as ReplayMemory.collectSnapshot
+        Priorities of old transitions change while training so they are saved as a whole
+        '''
+        snapshot = super().collectSnapshot(savedCount)
+        snapshot['whole']['priorities'] = self.tree.get(np.arange(self.capacity))
+        snapshot['meta'].update({'beta': float(self.beta), 'maxPriority': float(self.maxPriority)})
+        return snapshot
+
+    def restoreSnapshot(self, arrays, meta):
+        '''
+        Same as ReplayMemory.restoreSnapshot, also rebuilds the priority tree
+        '''
+        super().restoreSnapshot(arrays, meta)
+        if 'priorities' in arrays:
+            self.tree.update(np.arange(self.capacity), arrays['priorities'])
+            self.beta = meta['beta']
+            self.maxPriority = meta['maxPriority']
+        else:
+            # Memory was saved without priorities, start every transition from max priority
+            self.tree.update(np.arange(self.size), np.full(self.size, self.maxPriority ** self.alpha))
+
+
+class NStepAccumulator():
+    '''
+    Turns single step transitions of one episode into n-step transitions before they go to replay memory
+    Last nSteps transitions are kept in a window. Once it is full the oldest one is emitted with the
+    discounted sum of window rewards and the newest next state, it is bootstrapped with discount^steps
+    On a crash every waiting transition is emitted with its remaining rewards and no bootstrap
+    On a timeout every waiting transition is emitted bootstrapped from the last next state
+    Reaching the target doesn't end an episode, a new target is set so the window continues
+    '''
+    def __init__(self, nSteps, discountFactor):
+        self.nSteps = nSteps  # Rewards summed in a full transition
+        self.discountFactor = discountFactor
+        self.window = deque()  # (state, action, reward) of waiting transitions
+
+    def push(self, state, action, reward, nextState, done, timeOut=False):
+        '''
+        Add a single step transition
+
+        return list of (state, action, reward, nextState, done, steps) ready for memory
+        '''
+        self.window.append((state, action, reward))
+
+        if done or timeOut:
+            return self.flush(nextState, done)
+        if len(self.window) < self.nSteps:
+            return []
+        return [self.emit(nextState, False)]
+
+    def emit(self, nextState, done):
+        '''
+        Remove the oldest waiting transition
+
+        return it as n-step transition tuple
+        '''
+        nStepReward = 0.0
+        for i, (_, _, reward) in enumerate(self.window):
+            nStepReward += self.discountFactor ** i * reward
+
+        steps = len(self.window)
+        state, action, _ = self.window.popleft()
+        return state, action, nStepReward, nextState, done, steps
+
+    def flush(self, nextState, done):
+        '''
+        Emit every waiting transition at the end of an episode
+
+        return list of n-step transition tuples
+        '''
+        transitions = []
+        while self.window:
+            transitions.append(self.emit(nextState, done))
+        return transitions
+
+    def clear(self):
+        self.window.clear()
+
+
+class ReplayStore():
+    '''
+    Replay memory saved as memory mapped .npy files in a directory
+    There are two slots of files as big as the memory, a save writes the slot memory.json doesn't point to
+    and replaces memory.json only after the rows are flushed, so a crash never leaves torn rows behind it.
+    A save only writes rows appended since the older slot was written
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+        self.activeSlot = None  # Slot memory.json points to
+        self.slotCounts = [0, 0]  # appendCount of memory in every slot, only moves after a successful write
+
+        os.makedirs(directory, exist_ok=True)
+
+    def arrayPath(self, name, slot):
+        return os.path.join(self.directory, '{}.{}.npy'.format(name, slot))
+
+    def metaPath(self):
+        return os.path.join(self.directory, 'memory.json')
+
+    def exists(self):
+        return os.path.exists(self.metaPath())
+
+    def collect(self, memory):
+        '''
+        Take a snapshot of memory to be written later, possibly from another thread
+        Earlier snapshots may still be waiting, so rows since the older slot are taken whichever slot is written
+
+        return snapshot in dict
+        '''
+        fromCount = min(self.slotCounts)
+        snapshot = memory.collectSnapshot(fromCount)
+        snapshot['fromCount'] = fromCount
+        return snapshot
+
+    def openArray(self, name, slot, shape, dtype):
+        '''
+        Open array file of a slot for writing, create it if it doesn't exist or doesn't fit
+
+        return np.memmap
+        '''
+        path = self.arrayPath(name, slot)
+        if os.path.exists(path):
+            array = np.load(path, mmap_mode='r+')
+            if array.shape == shape and array.dtype == dtype:
+                return array
+            del array
+
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+    def write(self, snapshot, params=None):
+        '''
+        Write a snapshot with extra params like step counter and RNG states
+        '''
+        slot = 1 if self.activeSlot == 0 else 0
+        if snapshot['fromCount'] > self.slotCounts[slot]:
+            raise ValueError("Replay memory slot {} was not written, snapshot lacks rows since {}".format(
+                slot, self.slotCounts[slot]))
+
+        meta = dict(snapshot['meta'], slot=slot)
+        positions = snapshot['positions']
+
+        try:
+            for name, rows in snapshot['rows'].items():
+                array = self.openArray(name, slot, (meta['capacity'],) + rows.shape[1:], rows.dtype)
+                array[positions] = rows
+                array.flush()
+                del array
+
+            for name, values in snapshot['whole'].items():
+                array = self.openArray(name, slot, values.shape, values.dtype)
+                array[:] = values
+                array.flush()
+                del array
+        except Exception:
+            self.slotCounts[slot] = 0  # Rows of the slot are unknown now, next save writes all of them
+            raise
+
+        text = json.dumps({'meta': meta, 'params': params or {}})  # Serialized first so a bad value leaves no file
+        with open(self.metaPath() + '.tmp', 'w') as outfile:
+            outfile.write(text)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(self.metaPath() + '.tmp', self.metaPath())
+
+        self.activeSlot = slot
+        self.slotCounts[slot] = meta['appendCount']
+
+    def load(self, memory, episode=None):
+        '''
+        Fill memory from saved files, next saves continue from there
+        If episode is given, memory saved with another episode is left out and memory stays as it is
+
+        return params saved with the snapshot
+        '''
+        with open(self.metaPath()) as infile:
+            saved = json.load(infile)
+        slot = saved['meta']['slot']
+
+        self.activeSlot = slot  # Never written over while memory.json points to it
+        self.slotCounts = [0, 0]
+        if episode is not None and saved['params'].get('episode') != episode:
+            return saved['params']
+
+        arrays = {}
+        for name in ROW_ARRAYS + ('priorities',):
+            if os.path.exists(self.arrayPath(name, slot)):
+                arrays[name] = np.load(self.arrayPath(name, slot), mmap_mode='r')
+
+        memory.restoreSnapshot(arrays, saved['meta'])
+
+        # Other slot may have been torn by a crash, it is written completely next time
+        if all(name in arrays for name in ROW_ARRAYS):
+            self.slotCounts[slot] = memory.appendCount
+
+        return saved['params']
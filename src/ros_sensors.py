@@ -0,0 +1,71 @@
+import math
+import time
+import threading
+
+import rospy
+
+
+class LatestMessage():
+    '''
+    Persistent subscriber that keeps the latest message of a topic
+    rospy.wait_for_message creates and destroys a subscriber on every call,
+    this class subscribes once and lets callers wait for a fresh message instead
+    '''
+    def __init__(self, topic, msgType):
+        self.topic = topic
+        self.msg = None
+        self.stamp = None  # Header stamp of msg or receive time if it has no header
+        self.condition = threading.Condition()
+        self.subscriber = rospy.Subscriber(topic, msgType, self.callback, queue_size=1)
+
+    def callback(self, msg):
+        '''
+        ROS callback function
+        '''
+        header = getattr(msg, 'header', None)
+        if header is not None and not header.stamp.is_zero():
+            stamp = header.stamp
+        else:
+            stamp = rospy.get_rostime()
+
+        with self.condition:
+            self.msg = msg
+            self.stamp = stamp
+            self.condition.notify_all()
+
+    def clear(self):
+        '''
+        Drop cached message
+        Needed when simulation time is reset so old stamps are not compared with new ones
+        '''
+        with self.condition:
+            self.msg = None
+            self.stamp = None
+
+    def waitForFresh(self, after, timeout=5):
+        '''
+        Wait for the first message stamped after given ROS time
+        Returns immediately if the cached message is already fresh
+        None accepts any message, after clear it is one received since then
+
+        return message
+        '''
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.stamp is None or (after is not None and self.stamp <= after):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise rospy.ROSException("Timeout while waiting for a fresh message on " + self.topic)
+                self.condition.wait(remaining)
+
+            return self.msg
+
+
+def quaternionToYaw(x, y, z, w):
+    '''
+    Yaw of a quaternion, same as the last angle of tf euler_from_quaternion
+    Avoids importing tf just for this
+
+    return yaw in float
+    '''
+    return math.atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
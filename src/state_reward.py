@@ -0,0 +1,134 @@
+import numpy as np
+
+"""
+Vectorized state and reward calculations shared by environments
+
+Every function works on a single scan or on a batch of scans shaped (n, beams).
+Scalar inputs give scalar outputs, batched inputs give one row or value per scan.
+"""
+CRASH_REWARD = -150  # Reward when robot hits an obstacle
+TARGET_REWARD = 200  # Reward when robot reaches the target
+TARGET_REACH_RANGE = 0.2  # Target is reached below this distance
+
+
+def downsampleRanges(ranges, sectorCount):
+    '''
+    Min pool ranges of every scan to sectorCount sectors
+    Beams are split to sectors as evenly as possible, nearest obstacle of a sector is kept
+    so high resolution scanners give the same state size as the default 24 beams
+
+    return ranges in np.array shaped (..., sectorCount)
+    '''
+    beamCount = ranges.shape[-1]
+    if sectorCount is None or sectorCount == beamCount:
+        return ranges
+    if sectorCount > beamCount:
+        raise ValueError("Scan has {} beams, can't pool it to {} sectors".format(beamCount, sectorCount))
+
+    if beamCount % sectorCount == 0:
+        return ranges.reshape(ranges.shape[:-1] + (sectorCount, beamCount // sectorCount)).min(axis=-1)
+
+    edges = (np.arange(sectorCount) * beamCount) // sectorCount
+    return np.minimum.reduceat(ranges, edges, axis=-1)
+
+
+def processRanges(ranges, minCrashRange, laserMinRange, laserMaxRange, sectorCount=None):
+    '''
+    Modify laser data, inf ranges become laserMaxRange, nan ranges become 0 and then every range
+    is clamped to [laserMinRange, laserMaxRange], so nan ends up at laserMinRange (0 as before if it is 0)
+    Ranges are pooled to sectorCount sectors at the end
+    Robot is crashed if any raw range is between 0 and minCrashRange
+
+    return ranges in np.array and isCrash
+    '''
+    ranges = np.asarray(ranges, dtype=np.float64)
+    isCrash = np.any((ranges > 0) & (ranges < minCrashRange), axis=-1)
+    ranges = np.clip(np.nan_to_num(ranges, nan=0.0, posinf=laserMaxRange, neginf=laserMaxRange),
+                     laserMinRange, laserMaxRange)
+
+    return downsampleRanges(ranges, sectorCount), isCrash
+
+
+def calcHeadingAngles(targetPointX, targetPointY, yaw, robotX, robotY):
+    '''
+    Calculate heading angle from robot to target
+
+    return angles in np.array
+    '''
+    targetAngle = np.arctan2(np.subtract(targetPointY, robotY), np.subtract(targetPointX, robotX))
+
+    heading = targetAngle - yaw
+    heading = np.where(heading > np.pi, heading - 2 * np.pi, heading)
+    heading = np.where(heading < -np.pi, heading + 2 * np.pi, heading)
+
+    return np.round(heading, 2)
+
+
+def calcDistances(x1, y1, x2, y2):
+    '''
+    Calculate euler distance of given points
+
+    return distances in np.array
+    '''
+    return np.sqrt(np.subtract(x1, x2)**2 + np.subtract(y1, y2)**2)
+
+
+def calcStates(ranges, yaw, robotX, robotY, targetPointX, targetPointY,
+               minCrashRange, laserMinRange, laserMaxRange, sectorCount=None):
+    '''
+    Modify and downsample laser data
+    Calculate heading angle
+    Calculate distance to target
+    Calculate min range to nearest obstacle
+    Calculate angle to nearest obstacle
+
+    returns states as np.array and isCrash
+
+    State contains:
+    laserData, heading, distance, obstacleMinRange, obstacleAngle
+    '''
+    ranges, isCrash = processRanges(ranges, minCrashRange, laserMinRange, laserMaxRange, sectorCount)
+
+    heading = calcHeadingAngles(targetPointX, targetPointY, yaw, robotX, robotY)
+    distance = calcDistances(robotX, robotY, targetPointX, targetPointY)
+    obstacleMinRange = np.round(ranges.min(axis=-1), 2)
+    obstacleAngle = np.argmin(ranges, axis=-1)
+
+    extras = np.stack(np.broadcast_arrays(heading, distance, obstacleMinRange, obstacleAngle), axis=-1)
+    return np.concatenate((ranges, extras), axis=-1), isCrash
+
+
+def calcYawRewards(heading, actions):
+    '''
+    Reward of heading after taking actions, 1 is directly to target
+    Angular velocity of an action i is proportional to (2 - i), so every action adds pi/8
+    reference https://emanual.robotis.com/docs/en/platform/turtlebot3/ros2_machine_learning/
+
+    return rewards in np.array
+    '''
+    angle = -np.pi / 4 + np.asarray(heading) + (np.pi / 8 * np.asarray(actions)) + np.pi / 2
+    fraction = np.modf(0.25 + np.mod(0.5 * angle, 2 * np.pi) / np.pi)[0]
+
+    return 1 - 4 * np.abs(0.5 - fraction)
+
+
+def calcRewards(states, actions, targetDistance, isCrash, isTargetReached):
+    '''
+    Calculate rewards of actions from the states after them
+    Crash and reaching target have fixed rewards, otherwise reward is
+    yaw reward scaled by how far robot is compared to the episode start
+
+    return rewards in np.array
+    '''
+    states = np.asarray(states)
+    heading = states[..., -4]
+    currentDistance = states[..., -3]
+
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        distanceRate = np.float_power(2.0, np.divide(currentDistance, targetDistance))
+
+    rewards = np.round(calcYawRewards(heading, actions) * 5, 2) * distanceRate
+    rewards = np.where(isTargetReached, TARGET_REWARD, rewards)
+    rewards = np.where(isCrash, CRASH_REWARD, rewards)
+
+    return rewards
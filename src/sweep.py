@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import itertools
+import traceback
+import multiprocessing as mp
+from collections import deque
+
+import numpy as np
+
+from lidar_dqlearn import mergeConfig, setConfigValue
+from parallel_actors import ROS_MASTER_BASE_PORT, GAZEBO_MASTER_BASE_PORT
+
+"""
+Hyperparameter sweep runner
+Every trial is a run of lidar_dqlearn.py with some config keys changed.
+Trials run in a process pool, each in a fresh process with its own environment.
+Poor trials are stopped early by their rolling score and all trials are written to one results table.
+
+Spec is a JSON file like:
+{
+    "base": {"headless": true, "agent": {"episodeCount": 3000}},
+    "grid": {"agent.learningRate": [0.0003, 0.001], "agent.batchSize": [32, 64]},
+    "random": {"count": 4, "params": {"agent.epsilonDecay": {"uniform": [0.98, 0.999]},
+                                      "agent.targetUpdateCount": {"choice": [1000, 2000, 4000]}}},
+    "earlyStop": {"window": 100, "minEpisodes": 300, "minScore": -100, "patience": 1000},
+    "workers": 4,
+    "seed": 0,
+    "outputDir": "/tmp/sweep/"
+}
+Every grid point is run with "count" random samples of the random params.
+Random params can be {"uniform": [low, high]}, {"logUniform": [low, high]}, {"randint": [low, high]} or {"choice": [...]}.
+workers defaults to CPU count. Gazebo trials use the ROS and Gazebo masters of their worker slot,
+same ports as parallel actors, so launch one simulation per worker.
+
+Usage: python3 sweep.py spec.json
+"""
+
+
+class EarlyStopper():
+    '''
+    Keeps rolling mean of episode scores of a trial and tells when it is not worth continuing
+    Used as onEpisode callback of lidar_dqlearn.run
+    '''
+    def __init__(self, window=100, minEpisodes=0, minScore=None, patience=None):
+        self.window = window  # Episodes in rolling mean
+        self.minEpisodes = minEpisodes  # Never stop before this many episodes
+        self.minScore = minScore  # Stop if rolling mean is below this
+        self.patience = patience  # Stop if best rolling mean is not improved for this many episodes
+
+        self.scores = deque(maxlen=window)
+        self.episodes = 0
+        self.bestScore = None
+        self.bestEpisode = 0
+        self.stopReason = None
+
+    def rollingScore(self):
+        '''
+        return mean of the last window scores or None if there is no episode yet
+        '''
+        return float(np.mean(self.scores)) if self.scores else None
+
+    def __call__(self, episode, score):
+        '''
+        return True if trial should stop
+        '''
+        self.scores.append(score)
+        self.episodes += 1
+
+        rolling = self.rollingScore()
+        if len(self.scores) == self.window and (self.bestScore is None or rolling > self.bestScore):
+            self.bestScore = rolling
+            self.bestEpisode = self.episodes
+
+        if self.episodes < self.minEpisodes:
+            return False
+        if self.minScore is not None and rolling < self.minScore:
+            self.stopReason = "score"
+        elif self.patience is not None and self.episodes - max(self.bestEpisode, self.minEpisodes) > self.patience:
+            self.stopReason = "patience"
+
+        return self.stopReason is not None
+
+
+def sampleParam(rng, spec):
+    '''
+    Draw a random value of a param spec
+
+    return value
+    '''
+    if "uniform" in spec:
+        return rng.uniform(*spec["uniform"])
+    if "logUniform" in spec:
+        low, high = spec["logUniform"]
+        return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    if "randint" in spec:
+        return rng.randint(*spec["randint"])
+    if "choice" in spec:
+        return rng.choice(spec["choice"])
+    raise ValueError("Unknown random param spec " + str(spec))
+
+
+def makeTrials(spec):
+    '''
+    Expand sweep spec to trials
+
+    return list of dicts with trial id, changed params and full config
+    '''
+    rng = random.Random(spec.get("seed"))
+    outputDir = spec.get("outputDir", "/tmp/sweep/")
+
+    grid = spec.get("grid", {})
+    gridKeys = sorted(grid)
+    gridPoints = [dict(zip(gridKeys, values)) for values in itertools.product(*(grid[key] for key in gridKeys))]
+
+    randomSpec = spec.get("random", {})
+    randomParams = randomSpec.get("params", {})
+    sampleCount = randomSpec.get("count", 1) if randomParams else 1
+
+    trials = []
+    for point in gridPoints:
+        for _ in range(sampleCount):
+            params = dict(point)
+            params.update({key: sampleParam(rng, randomParams[key]) for key in sorted(randomParams)})
+
+            trialId = len(trials)
+            config = mergeConfig(spec.get("base", {}), {})
+            for key, value in params.items():
+                setConfigValue(config, key, value)
+            setConfigValue(config, "agent.savePath", os.path.join(outputDir, "trial{}".format(trialId), ""))
+
+            trials.append({"trial": trialId, "params": params, "config": config, "earlyStop": spec.get("earlyStop", {})})
+
+    return trials
+
+
+def runTrial(trial, slots):
+    '''
+    Run a trial in a pool process, output of training goes to log.txt in the trial directory
+
+    return result in dict
+    '''
+    from lidar_dqlearn import run
+
+    savePath = trial["config"]["agent"]["savePath"]
+    os.makedirs(savePath, exist_ok=True)
+
+    slot = slots.get()  # Gazebo trials of different workers use different simulations
+    os.environ["ROS_MASTER_URI"] = "http://localhost:" + str(ROS_MASTER_BASE_PORT + slot)
+    os.environ["GAZEBO_MASTER_URI"] = "http://localhost:" + str(GAZEBO_MASTER_BASE_PORT + slot)
+
+    stopper = EarlyStopper(**trial["earlyStop"])
+    startTime = time.time()
+    status = "finished"
+    error = ""
+
+    stdout = sys.stdout
+    try:
+        with open(os.path.join(savePath, "log.txt"), "w", buffering=1) as log:
+            sys.stdout = log
+            try:
+                run(trial["config"], stopper)
+            except Exception:
+                status = "failed"
+                error = traceback.format_exc().strip().splitlines()[-1]
+                log.write(traceback.format_exc())
+    finally:
+        sys.stdout = stdout
+        slots.put(slot)
+
+    if status == "finished" and stopper.stopReason is not None:
+        status = "stopped (" + stopper.stopReason + ")"
+
+    return {
+        "trial": trial["trial"],
+        "status": status,
+        "episodes": stopper.episodes,
+        "rollingScore": stopper.rollingScore(),
+        "bestRollingScore": stopper.bestScore,
+        "minutes": (time.time() - startTime) / 60,
+        "error": error,
+        "params": trial["params"],
+    }
+
+
+def writeResults(results, path):
+    '''
+    Write results as a CSV table, best trials first
+    '''
+    paramKeys = sorted({key for result in results for key in result["params"]})
+    columns = ["trial", "status", "episodes", "rollingScore", "bestRollingScore", "minutes", "error"]
+
+    def sortKey(result):
+        score = result["bestRollingScore"] if result["bestRollingScore"] is not None else result["rollingScore"]
+        return -score if score is not None else float("inf")
+
+    with open(path + ".tmp", "w", newline="") as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(columns + paramKeys)
+        for result in sorted(results, key=sortKey):
+            writer.writerow([result[column] for column in columns] + [result["params"].get(key) for key in paramKeys])
+    os.replace(path + ".tmp", path)
+
+
+def runSweep(spec):
+    '''
+    Run every trial of the spec and write results.csv to output directory
+
+    return list of results
+    '''
+    trials = makeTrials(spec)
+    outputDir = spec.get("outputDir", "/tmp/sweep/")
+    workers = min(spec.get("workers") or os.cpu_count(), len(trials))
+    resultsPath = os.path.join(outputDir, "results.csv")
+    os.makedirs(outputDir, exist_ok=True)
+
+    print("Running {} trials with {} workers, results in {}".format(len(trials), workers, resultsPath))
+
+    ctx = mp.get_context('spawn')  # Every trial gets a clean interpreter (rospy.init_node and TensorFlow state)
+    slots = ctx.Manager().Queue()
+    for slot in range(workers):
+        slots.put(slot)
+
+    results = []
+    with ctx.Pool(processes=workers, maxtasksperchild=1) as pool:
+        pending = [pool.apply_async(runTrial, (trial, slots)) for trial in trials]
+        for result in pending:
+            result = result.get()
+            results.append(result)
+            writeResults(results, resultsPath)
+
+            print('Trial: {} | Status: {} | Episodes: {} | RollingScore: {} | Minutes: {:.1f} | Params: {}'.format(
+                result["trial"], result["status"], result["episodes"], result["rollingScore"], result["minutes"],
+                json.dumps(result["params"])))
+
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python3 sweep.py spec.json")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as infile:
+        runSweep(json.load(infile))
@@ -0,0 +1,40 @@
+"""
+Target network synchronization with variable assigns
+Weights never leave TensorFlow, there are no get_weights/set_weights lists of numpy arrays.
+TensorFlow is imported by TargetSync, blendWeights itself only calls assign so it can be used in a tf.function.
+"""
+
+
+def blendWeights(weightPairs, rate):
+    '''
+    Move every target variable rate of the way to its online variable in place
+    rate 1 copies online variables
+    '''
+    for targetWeight, onlineWeight in weightPairs:
+        if rate == 1:
+            targetWeight.assign(onlineWeight)
+        else:
+            targetWeight.assign(targetWeight + rate * (onlineWeight - targetWeight))
+
+
+class TargetSync():
+    '''
+    Copies online model weights into target model with a compiled assign
+    Soft updates blend weightPairs with blendWeights inside the train step
+    '''
+    def __init__(self, onlineModel, targetModel):
+        import tensorflow as tf
+
+        self.weightPairs = list(zip(targetModel.weights, onlineModel.weights))
+
+        for targetWeight, onlineWeight in self.weightPairs:
+            if tuple(targetWeight.shape) != tuple(onlineWeight.shape):
+                raise ValueError("Target and online models have different architectures")
+
+        self.copyFunction = tf.function(lambda: blendWeights(self.weightPairs, 1))
+
+    def copy(self):
+        '''
+        Hard update, target weights become online weights
+        '''
+        self.copyFunction()
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class VecGymEnv():
+    '''
+    Steps a list of independent environments in lockstep
+    Observations, rewards and dones are returned as arrays with one row per environment
+    Finished episodes are reset automatically
+    '''
+    def __init__(self, envs, timeOutLim=None):
+        self.envs = envs
+        self.envCount = len(envs)
+        self.stateSize = envs[0].stateSize
+        self.actionSize = envs[0].actionSize
+        self.timeOutLim = timeOutLim  # Episodes are cut after this step count, None means never
+
+        self.states = np.zeros((self.envCount, self.stateSize))  # Current states to act on
+        self.episodeSteps = np.zeros(self.envCount, dtype=np.int64)
+        self.episodeScores = np.zeros(self.envCount)
+
+        # Step count and score of the last finished episode of every environment
+        self.lastEpisodeSteps = np.zeros(self.envCount, dtype=np.int64)
+        self.lastEpisodeScores = np.zeros(self.envCount)
+
+    def reset(self):
+        '''
+        Reset all environments
+
+        returns states as (envCount, stateSize) np.array
+        '''
+        for i, env in enumerate(self.envs):
+            self.states[i] = env.reset()
+
+        self.episodeSteps[:] = 0
+        self.episodeScores[:] = 0
+
+        return self.states.copy()
+
+    def step(self, actions):
+        '''
+        Act in all environments with one action per environment
+        Environments whose episode is done or timed out are reset and their
+        new first state is put to self.states
+
+        returns nextStates, rewards, dones, timeOuts as np.array
+        nextStates are the real next states also for finished episodes so they can be saved to memory
+        '''
+        nextStates = np.empty((self.envCount, self.stateSize))
+        rewards = np.empty(self.envCount)
+        dones = np.zeros(self.envCount, dtype=bool)
+
+        for i, env in enumerate(self.envs):
+            nextStates[i], rewards[i], dones[i] = env.step(actions[i])
+
+        self.episodeSteps += 1
+        self.episodeScores += rewards
+
+        if self.timeOutLim is None:
+            timeOuts = np.zeros(self.envCount, dtype=bool)
+        else:
+            timeOuts = ~dones & (self.episodeSteps >= self.timeOutLim)
+
+        self.states[:] = nextStates
+        for i in np.flatnonzero(dones | timeOuts):
+            self.lastEpisodeSteps[i] = self.episodeSteps[i]
+            self.lastEpisodeScores[i] = self.episodeScores[i]
+            self.episodeSteps[i] = 0
+            self.episodeScores[i] = 0
+            self.states[i] = self.envs[i].reset()
+
+        return nextStates, rewards, dones, timeOuts
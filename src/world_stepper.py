@@ -0,0 +1,59 @@
+import time
+
+import rospy
+from std_msgs.msg import UInt32
+
+
+class WorldStepper():
+    '''
+    Advances paused Gazebo physics by a fixed number of ticks for every action
+    Tick counts are published on one persistent topic to WorldStepPlugin of the world file,
+    the plugin steps the world in place so no process is started per action.
+    Simulated duration of an action doesn't depend on host load or real_time_factor
+    '''
+    def __init__(self, ticksPerStep, physicsStepSize=0.001, topic='/gazebo/multi_step', connectTimeout=10):
+        self.ticksPerStep = ticksPerStep  # Physics ticks for one action
+        self.physicsStepSize = physicsStepSize  # max_step_size in the world file
+        self.stepDuration = rospy.Duration.from_sec(ticksPerStep * physicsStepSize)
+        self.targetTime = None  # Simulation time at the end of the last requested step
+        self.publisher = rospy.Publisher(topic, UInt32, queue_size=10)
+
+        # Messages published before the plugin is connected are lost, physics is paused so wait in wall time
+        deadline = time.time() + connectTimeout
+        while self.publisher.get_num_connections() == 0:
+            if time.time() > deadline:
+                raise rospy.ROSException("Nothing subscribed to " + topic +
+                                         ", lockstep needs libworld_step_plugin.so in the world file")
+            time.sleep(0.01)
+
+    def step(self):
+        '''
+        Request one action of physics ticks, returns without waiting for them
+        End of the step is counted from the end of the previous one, /clock can lag behind
+        the ticks already done and a stale sensor message would pass as fresh.
+        The clock is only read for the first step.
+
+        return ROS time at the end of the step
+        '''
+        if self.targetTime is None:
+            self.targetTime = rospy.get_rostime()
+        self.targetTime = self.targetTime + self.stepDuration
+        self.publisher.publish(UInt32(self.ticksPerStep))
+        return self.targetTime
+
+    def reset(self, startTime=None):
+        '''
+        Count steps from startTime after the simulation time was reset
+        None reads the clock again at the next step
+        '''
+        self.targetTime = startTime
+
+    def sampleAfter(self, targetTime, sensorPeriod):
+        '''
+        Physics stays paused at targetTime, the last message of a sensor is stamped within
+        one of its update periods before it and never before the step started
+
+        return stamp that the sensor message of the step is newer than
+        '''
+        window = min(sensorPeriod, self.stepDuration.to_sec())
+        return targetTime - rospy.Duration.from_sec(window)
@@ -0,0 +1,109 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lidar_dqlearn import Agent, trainVectorized  # noqa: E402
+
+"""
+Agent with saved checkpoints, Keras is only needed by tests that build models
+"""
+STATE_SIZE = 28
+ACTION_SIZE = 5
+
+
+def randomWeights(rng, sizes=(STATE_SIZE, 16, 16, ACTION_SIZE)):
+    '''
+    return kernel, bias pairs of a Dense relu network like Keras get_weights
+    '''
+    weights = []
+    for inputSize, outputSize in zip(sizes[:-1], sizes[1:]):
+        weights.append(rng.randn(inputSize, outputSize).astype(np.float32))
+        weights.append(rng.randn(outputSize).astype(np.float32))
+    return weights
+
+
+class FinishingVecEnv():
+    '''
+    VecEnv stand-in where every environment finishes an episode at every step
+    '''
+    def __init__(self, envCount, rng):
+        self.envCount = envCount
+        self.rng = rng
+        self.states = rng.rand(envCount, STATE_SIZE)
+        self.lastEpisodeScores = np.zeros(envCount)
+        self.lastEpisodeSteps = np.ones(envCount, dtype=np.int64)
+
+    def reset(self):
+        return self.states.copy()
+
+    def step(self, actions):
+        self.actedStates = self.states.copy()
+        nextStates = self.rng.rand(self.envCount, STATE_SIZE)
+        self.states = self.rng.rand(self.envCount, STATE_SIZE)
+        dones = np.ones(self.envCount, dtype=bool)
+        return nextStates, np.zeros(self.envCount), dones, np.zeros(self.envCount, dtype=bool)
+
+
+class SavedCheckpointAgentTest(unittest.TestCase):
+    def setUp(self):
+        self.savePath = tempfile.mkdtemp() + '/'
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.savePath)
+
+    def testActingNetworkOfLoadedCheckpoint(self):
+        weights = randomWeights(self.rng)
+        trainer = Agent(STATE_SIZE, ACTION_SIZE, {'isTrainActive': False, 'loadModel': True, 'savePath': self.savePath})
+        trainer.checkpoints.write(7, weights, [], {'epsilon': 0.05, 'stepCounter': 10})
+
+        agent = Agent(STATE_SIZE, ACTION_SIZE, {'isTrainActive': False, 'loadModel': True, 'savePath': self.savePath})
+        agent.restoreModel(7)
+        self.assertIsNone(agent.onlineModel)
+
+        agent.copyActingNetwork()  # Parallel actors start with it, there is no Keras model to copy
+        agent.syncActingNetwork()
+        for value, expected in zip(agent.actingNetwork.getWeights(), weights):
+            np.testing.assert_array_equal(value, expected)
+
+    def testVectorizedTrainingStopsAtEpisodeCount(self):
+        trainer = Agent(STATE_SIZE, ACTION_SIZE, {'isTrainActive': False, 'loadModel': True, 'savePath': self.savePath})
+        trainer.checkpoints.write(0, randomWeights(self.rng), [], {'epsilon': 0.5})
+
+        agent = Agent(STATE_SIZE, ACTION_SIZE, {'isTrainActive': False, 'loadModel': True, 'savePath': self.savePath,
+                                                'episodeCount': 7})
+        agent.restoreModel(0)
+        episodes = []
+        trainVectorized(agent, FinishingVecEnv(4, self.rng), onEpisode=lambda episode, score: episodes.append(episode))
+
+        self.assertEqual(episodes, list(range(1, 7)))  # Same episodes as trainEpisodes, last step finished 4 at once
+
+    def testVectorizedMaxQOfEveryEnvironment(self):
+        trainer = Agent(STATE_SIZE, ACTION_SIZE, {'isTrainActive': False, 'loadModel': True, 'savePath': self.savePath})
+        trainer.checkpoints.write(0, randomWeights(self.rng), [], {'epsilon': 0.0})
+
+        agent = Agent(STATE_SIZE, ACTION_SIZE, {'isTrainActive': False, 'loadModel': True, 'savePath': self.savePath,
+                                                'episodeCount': 5})
+        agent.restoreModel(0)
+        vecEnv = FinishingVecEnv(4, self.rng)
+        metrics = mock.Mock()
+
+        def trainScheduled():
+            agent.qValue = np.full((1, ACTION_SIZE), 100.0)  # Train step output of one state
+        agent.trainScheduled = trainScheduled
+        trainVectorized(agent, vecEnv, metrics=metrics)
+
+        avgMaxQ = [call[1]['avgMaxQ'] for call in metrics.logEpisode.call_args_list]
+        expected = np.max(agent.actingNetwork.predict(vecEnv.actedStates), axis=1)
+        np.testing.assert_allclose(avgMaxQ, expected, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
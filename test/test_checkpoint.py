@@ -0,0 +1,57 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from checkpoint import CheckpointManager  # noqa: E402
+from replay_memory import PrioritizedReplayMemory, ReplayStore  # noqa: E402
+
+"""
+CheckpointManager writes model checkpoints with the replay memory from its writer thread
+"""
+
+
+class CheckpointManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = ReplayStore(os.path.join(self.directory, 'memory'))
+        self.checkpoints = CheckpointManager(self.directory + '/', replayStore=self.store)
+        self.weights = [np.arange(6, dtype=np.float32).reshape(2, 3), np.ones(3, dtype=np.float32)]
+
+        self.memory = PrioritizedReplayMemory(20, 4)
+        rng = np.random.RandomState(0)
+        for _ in range(10):
+            self.memory.append(rng.rand(4), 1, 0.5, rng.rand(4), False)
+
+    def tearDown(self):
+        self.checkpoints.close()
+        shutil.rmtree(self.directory)
+
+    def testPrioritizedMemoryWithLargeErrors(self):
+        self.memory.updatePriorities(np.arange(10), np.full(10, 3.5, dtype=np.float32))
+        self.checkpoints.save(5, self.weights, [], {'epsilon': 0.5}, self.memory)
+        self.checkpoints.flush()
+
+        self.assertIsNone(self.checkpoints.lastError)
+        self.assertEqual(self.checkpoints.episodes(), [5])
+        self.assertFalse(os.path.exists(self.store.metaPath() + '.tmp'))
+
+    def testModelSavedWhenMemoryFails(self):
+        with mock.patch.object(self.store, 'write', side_effect=OSError("Disk full")):
+            self.checkpoints.save(5, self.weights, [], {'epsilon': 0.5}, self.memory)
+            self.checkpoints.flush()
+
+        self.assertIsInstance(self.checkpoints.lastError, OSError)
+        weights, optimizerWeights, params = self.checkpoints.load(5)
+        np.testing.assert_array_equal(weights[0], self.weights[0])
+        self.assertEqual(params['epsilon'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from replay_memory import NStepAccumulator, ReplayMemory  # noqa: E402
+
+"""
+NStepAccumulator output for full windows, crashes, timeouts and reached targets
+States are step numbers so every emitted transition shows where it starts and bootstraps from.
+"""
+GAMMA = 0.9
+N_STEPS = 3
+TARGET_REWARD = 200.0
+
+
+def discounted(rewards):
+    return sum(GAMMA ** i * reward for i, reward in enumerate(rewards))
+
+
+class NStepAccumulatorTest(unittest.TestCase):
+    def setUp(self):
+        self.accumulator = NStepAccumulator(N_STEPS, GAMMA)
+
+    def push(self, step, reward, done=False, timeOut=False):
+        '''
+        Push the transition from state step to state step + 1 with action step % 5
+        '''
+        return self.accumulator.push(step, step % 5, reward, step + 1, done, timeOut)
+
+    def testFullWindow(self):
+        rewards = [1.0, -2.0, 3.0, 0.5, 4.0]
+        emitted = []
+        for step, reward in enumerate(rewards):
+            transitions = self.push(step, reward)
+            self.assertEqual(len(transitions), 0 if step < N_STEPS - 1 else 1)
+            emitted += transitions
+
+        self.assertEqual(len(emitted), 3)
+        for first, (state, action, reward, nextState, done, steps) in enumerate(emitted):
+            self.assertEqual((state, action, nextState, done, steps), (first, first % 5, first + N_STEPS, False, N_STEPS))
+            self.assertAlmostEqual(reward, discounted(rewards[first:first + N_STEPS]))
+        self.assertEqual(len(self.accumulator.window), N_STEPS - 1)
+
+    def testCrashDoesNotBootstrap(self):
+        rewards = [1.0, 2.0, 3.0, -150.0]
+        emitted = []
+        for step, reward in enumerate(rewards):
+            emitted += self.push(step, reward, done=step == len(rewards) - 1)
+
+        self.assertEqual([t[0] for t in emitted], [0, 1, 2, 3])
+        self.assertEqual(emitted[0][3:], (N_STEPS, False, N_STEPS))  # Full window before the crash
+        for state, action, reward, nextState, done, steps in emitted[1:]:
+            # Every transition of the flush ends at the crash with only its remaining rewards
+            self.assertTrue(done)
+            self.assertEqual(nextState, len(rewards))
+            self.assertEqual(steps, len(rewards) - state)
+            self.assertAlmostEqual(reward, discounted(rewards[state:]))
+        self.assertEqual(len(self.accumulator.window), 0)
+
+    def testTimeoutBootstraps(self):
+        rewards = [1.0, 2.0, 3.0, 4.0]
+        emitted = []
+        for step, reward in enumerate(rewards):
+            emitted += self.push(step, reward, timeOut=step == len(rewards) - 1)
+
+        flushed = emitted[1:]
+        self.assertEqual([t[0] for t in flushed], [1, 2, 3])
+        self.assertEqual([t[5] for t in flushed], [3, 2, 1])  # Shorter than n, bootstrapped with discount^steps
+        for state, action, reward, nextState, done, steps in flushed:
+            self.assertFalse(done)
+            self.assertEqual(nextState, len(rewards))
+            self.assertAlmostEqual(reward, discounted(rewards[state:]))
+        self.assertEqual(len(self.accumulator.window), 0)
+
+    def testReachedTargetKeepsWindow(self):
+        rewards = [1.0, TARGET_REWARD, 2.0, 3.0]
+        emitted = []
+        for step, reward in enumerate(rewards):
+            emitted += self.push(step, reward)  # Reaching the target is neither done nor a timeout
+
+        self.assertEqual([t[0] for t in emitted], [0, 1])
+        self.assertAlmostEqual(emitted[0][2], discounted(rewards[0:3]))
+        self.assertAlmostEqual(emitted[1][2], discounted(rewards[1:4]))
+        self.assertEqual([t[5] for t in emitted], [N_STEPS, N_STEPS])
+        self.assertEqual(len(self.accumulator.window), N_STEPS - 1)
+
+    def testTransitionsFitMemory(self):
+        memory = ReplayMemory(10, 1)
+        for step in range(4):
+            for transition in self.push(step, 1.0, done=step == 3):
+                memory.append(*transition)
+
+        self.assertEqual(memory.steps[:len(memory)].tolist(), [3, 3, 2, 1])
+        self.assertEqual(memory.dones[:len(memory)].tolist(), [False, True, True, True])
+        np.testing.assert_allclose(memory.rewards[:len(memory)], [discounted([1.0] * n) for n in (3, 3, 2, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lidar_dqlearn import Agent  # noqa: E402
+from numpy_qnet import NumpyQNetwork  # noqa: E402
+
+try:
+    import keras
+except ImportError:
+    keras = None
+
+"""
+NumpyQNetwork Q values against Keras predict of the network built by Agent.initNetwork
+"""
+STATE_SIZE = 28
+ACTION_SIZE = 5
+
+
+@unittest.skipIf(keras is None, "Keras is not installed")
+class NumpyQNetworkTest(unittest.TestCase):
+    def setUp(self):
+        self.savePath = tempfile.mkdtemp() + '/'
+        self.rng = np.random.RandomState(0)
+        keras.utils.set_random_seed(0)
+        self.agent = Agent(STATE_SIZE, ACTION_SIZE, {'savePath': self.savePath, 'batchSize': 16, 'memorySize': 100})
+
+    def tearDown(self):
+        self.agent.checkpoints.close()
+        shutil.rmtree(self.savePath)
+
+    def assertSameAsKeras(self, network, states):
+        expected = self.agent.onlineModel.predict(states, verbose=0)
+        np.testing.assert_allclose(network.predict(states), expected, rtol=1e-5, atol=1e-5)
+
+    def testSameAsKerasPredict(self):
+        network = NumpyQNetwork(self.agent.onlineModel.get_weights())
+        states = self.rng.rand(10, STATE_SIZE)  # float64 like the environment states
+
+        self.assertSameAsKeras(network, states)  # Buffers grow from a single state
+        self.assertSameAsKeras(network, states[:1])
+        expectedAction = np.argmax(self.agent.onlineModel.predict(states[3:4], verbose=0))
+        self.assertEqual(network.calcAction(states[3]), expectedAction)
+
+    def testSameAfterTraining(self):
+        for _ in range(20):
+            self.agent.memory.append(self.rng.rand(STATE_SIZE), self.rng.randint(ACTION_SIZE), self.rng.randn(),
+                                     self.rng.rand(STATE_SIZE), False)
+        self.agent.trainModel()
+        self.agent.copyActingNetwork()
+
+        self.assertSameAsKeras(self.agent.actingNetwork, self.rng.rand(10, STATE_SIZE))
+
+
+if __name__ == '__main__':
+    unittest.main()
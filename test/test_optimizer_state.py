@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from optimizer_state import getOptimizerWeights, setOptimizerWeights  # noqa: E402
+
+try:
+    import keras
+except ImportError:
+    keras = None
+
+"""
+Optimizer state round trip through getOptimizerWeights and setOptimizerWeights
+A fresh optimizer restored from a trained one must continue training exactly the same way.
+"""
+
+
+def makeModel(seed):
+    from keras.models import Sequential
+    from keras.optimizers import RMSprop
+    from keras.layers import Dense
+
+    np.random.seed(seed)
+    model = Sequential([Dense(8, activation='relu', input_shape=(4,)), Dense(3)])
+    model.compile(loss="mse", optimizer=RMSprop(learning_rate=0.01, rho=0.9, epsilon=1e-06))
+    return model
+
+
+def trainSteps(model, count, seed):
+    import tensorflow as tf
+
+    rng = np.random.RandomState(seed)
+    for _ in range(count):
+        x = rng.rand(16, 4).astype(np.float32)
+        y = rng.rand(16, 3).astype(np.float32)
+        with tf.GradientTape() as tape:
+            loss = tf.reduce_mean(tf.square(model(x, training=True) - y))
+        gradients = tape.gradient(loss, model.trainable_variables)
+        model.optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+
+
+@unittest.skipIf(keras is None, "Keras is not installed")
+class OptimizerStateTest(unittest.TestCase):
+    def testRestoredOptimizerContinuesTheSame(self):
+        trained = makeModel(0)
+        trainSteps(trained, 3, seed=1)
+        weights = trained.get_weights()
+        optimizerWeights = getOptimizerWeights(trained.optimizer)
+
+        restored = makeModel(2)
+        restored.set_weights(weights)
+        setOptimizerWeights(restored.optimizer, restored.trainable_variables, optimizerWeights)
+        for value, expected in zip(getOptimizerWeights(restored.optimizer), optimizerWeights):
+            np.testing.assert_array_equal(value, expected)
+
+        trainSteps(trained, 2, seed=3)
+        trainSteps(restored, 2, seed=3)
+        for value, expected in zip(restored.get_weights(), trained.get_weights()):
+            np.testing.assert_allclose(value, expected, rtol=1e-6)
+
+    def testMismatchFailsClearly(self):
+        trained = makeModel(0)
+        trainSteps(trained, 1, seed=1)
+        optimizerWeights = getOptimizerWeights(trained.optimizer)
+
+        restored = makeModel(2)
+        with self.assertRaises(ValueError):
+            setOptimizerWeights(restored.optimizer, restored.trainable_variables, optimizerWeights[:-1])
+
+    def testOptimizerWithoutVariablesFails(self):
+        with self.assertRaises(RuntimeError):
+            getOptimizerWeights(object())
+
+
+if __name__ == '__main__':
+    unittest.main()
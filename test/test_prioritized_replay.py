@@ -0,0 +1,119 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from replay_memory import SumTree, PrioritizedReplayMemory  # noqa: E402
+
+"""
+SumTree and PrioritizedReplayMemory sampling, priority updates and importance sampling weights
+"""
+STATE_SIZE = 3
+
+
+def assertTreeConsistent(testCase, tree):
+    '''
+    Every inner node must be the sum of its children
+    '''
+    inner = np.arange(1, tree.leafCount)
+    np.testing.assert_allclose(tree.tree[inner], tree.tree[2 * inner] + tree.tree[2 * inner + 1])
+
+
+def filledMemory(size, capacity, alpha=0.6, beta=0.4, betaIncrement=0.000001):
+    memory = PrioritizedReplayMemory(capacity, STATE_SIZE, alpha, beta, betaIncrement)
+    for i in range(size):
+        memory.append(np.full(STATE_SIZE, i), i % 5, 0.0, np.full(STATE_SIZE, i + 1), False)
+    return memory
+
+
+class SumTreeTest(unittest.TestCase):
+    def testBatchUpdateWithDuplicates(self):
+        tree = SumTree(10)
+        tree.update(np.arange(10), np.arange(1.0, 11.0))
+        tree.update([3, 7, 3, 3], [100.0, 5.0, 200.0, 0.5])  # Last value of a duplicate wins like numpy assignment
+
+        expected = np.arange(1.0, 11.0)
+        expected[3] = 0.5
+        expected[7] = 5.0
+        np.testing.assert_array_equal(tree.get(np.arange(10)), expected)
+        self.assertAlmostEqual(tree.total(), expected.sum())
+        assertTreeConsistent(self, tree)
+
+    def testBatchUpdateSameAsSingleUpdates(self):
+        rng = np.random.RandomState(0)
+        batchTree = SumTree(37)
+        singleTree = SumTree(37)
+        for _ in range(20):
+            indices = rng.randint(0, 37, size=8)
+            priorities = rng.rand(8)
+            batchTree.update(indices, priorities)
+            for index, priority in zip(indices, priorities):
+                singleTree.updateOne(index, priority)
+
+        np.testing.assert_allclose(batchTree.tree, singleTree.tree)
+        assertTreeConsistent(self, batchTree)
+
+    def testFindCumulativeRanges(self):
+        tree = SumTree(5)
+        tree.update(np.arange(5), [1.0, 0.0, 2.0, 3.0, 4.0])
+        values = [0.0, 0.99, 1.0, 2.99, 3.0, 5.99, 6.0, 9.99]
+        np.testing.assert_array_equal(tree.find(values), [0, 0, 2, 2, 3, 3, 4, 4])  # Zero priority leaf 1 is skipped
+
+
+class PrioritizedReplayMemoryTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def testProportionalSampling(self):
+        memory = filledMemory(8, 8, alpha=0.5)
+        tdErrors = np.array([0.0, 1.0, 4.0, 9.0, 16.0, 0.0, 25.0, 1.0])
+        memory.updatePriorities(np.arange(8), tdErrors)
+
+        counts = np.zeros(8)
+        for _ in range(400):
+            counts += np.bincount(memory.sampleIndices(64), minlength=8)
+
+        priorities = (tdErrors + memory.priorityEpsilon) ** 0.5
+        np.testing.assert_allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.005)
+
+    def testImportanceSamplingWeightsAndBetaAnnealing(self):
+        memory = filledMemory(16, 32, beta=0.4, betaIncrement=0.25)
+        memory.updatePriorities(np.arange(16), np.linspace(0.1, 3.0, 16))
+
+        for beta in (0.4, 0.65, 0.9, 1.0, 1.0):
+            *_, indices, weights = memory.sample(8)
+            probs = memory.tree.get(indices) / memory.tree.total()
+            expected = (len(memory) * probs) ** -beta
+            np.testing.assert_allclose(weights, expected / expected.max(), rtol=1e-6)
+            self.assertEqual(weights.dtype, np.float32)
+            self.assertAlmostEqual(weights.max(), 1.0)
+
+        self.assertEqual(memory.beta, 1.0)  # Annealed up to 1 and kept there
+
+    def testNewTransitionsGetMaxPriority(self):
+        memory = filledMemory(4, 16)
+        memory.updatePriorities([0, 1], np.array([2.0, 6.0], dtype=np.float32))
+        memory.append(np.zeros(STATE_SIZE), 0, 0.0, np.zeros(STATE_SIZE), False)
+
+        self.assertAlmostEqual(memory.tree.get([4])[0], (6.0 + memory.priorityEpsilon) ** memory.alpha)
+        self.assertIsInstance(memory.maxPriority, float)
+
+    def testEmptyLeavesAreNeverSampled(self):
+        memory = filledMemory(5, 64)  # Leaves 5.. are empty
+        memory.updatePriorities(np.arange(5), np.array([1.0, 2.0, 3.0, 4.0, 5.0]))
+
+        # Largest random values land on the end of the priority range, floating point errors can step over it
+        with mock.patch.object(np.random, 'rand', side_effect=lambda n: np.ones(n)):
+            indices = memory.sampleIndices(16)
+        self.assertTrue(np.all(indices < len(memory)))
+        self.assertEqual(indices[-1], len(memory) - 1)
+
+        self.assertTrue(np.all(memory.sampleIndices(1000) < len(memory)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from replay_memory import ReplayMemory, PrioritizedReplayMemory, ReplayStore, ROW_ARRAYS  # noqa: E402
+
+"""
+ReplayStore saves, failed writes and crashes in the middle of a write
+A crash is played by a write that raises after some rows are written, then a new store loads the directory.
+"""
+CAPACITY = 50
+STATE_SIZE = 4
+
+
+def appendRandom(memory, rng, count):
+    for _ in range(count):
+        memory.append(rng.rand(STATE_SIZE), rng.randint(5), rng.rand(), rng.rand(STATE_SIZE), rng.rand() < 0.1)
+
+
+def failingOpenArray(store, failAt):
+    '''
+    return openArray of store that raises at its failAt th call, rows of earlier calls are already written
+    '''
+    openArray = store.openArray
+    calls = []
+
+    def fail(*args):
+        calls.append(args)
+        if len(calls) == failAt:
+            raise OSError("Disk full")
+        return openArray(*args)
+    return fail
+
+
+class ReplayStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertMemoryEqual(self, memory, expected):
+        self.assertEqual((memory.index, memory.size, memory.appendCount),
+                         (expected.index, expected.size, expected.appendCount))
+        for name in ROW_ARRAYS:
+            np.testing.assert_array_equal(getattr(memory, name)[:memory.size], getattr(expected, name)[:expected.size])
+
+    def loadNew(self, episode=None, memoryClass=ReplayMemory):
+        memory = memoryClass(CAPACITY, STATE_SIZE)
+        params = ReplayStore(self.directory).load(memory, episode)
+        return memory, params
+
+    def testIncrementalSavesWrapAround(self):
+        memory = ReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        for episode in range(1, 8):
+            appendRandom(memory, self.rng, 17)
+            store.write(store.collect(memory), {'episode': episode})
+
+            loaded, params = self.loadNew(episode)
+            self.assertEqual(params['episode'], episode)
+            self.assertMemoryEqual(loaded, memory)
+
+    def testPendingSnapshotsWrittenInOrder(self):
+        memory = ReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        snapshots = []
+        for _ in range(3):  # Collected before any of them is written, like a lagging writer thread
+            appendRandom(memory, self.rng, 9)
+            snapshots.append(store.collect(memory))
+        for episode, snapshot in enumerate(snapshots):
+            store.write(snapshot, {'episode': episode})
+
+        self.assertMemoryEqual(self.loadNew()[0], memory)
+
+    def testFailedWriteIsSentAgain(self):
+        memory = ReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        appendRandom(memory, self.rng, 10)
+        store.write(store.collect(memory), {'episode': 1})
+        saved = self.loadNew()[0]
+
+        appendRandom(memory, self.rng, 10)
+        with mock.patch.object(store, 'openArray', failingOpenArray(store, 3)):
+            with self.assertRaises(OSError):
+                store.write(store.collect(memory), {'episode': 2})
+        self.assertEqual(store.slotCounts[1], 0)
+        self.assertMemoryEqual(self.loadNew()[0], saved)  # Crash here keeps the last complete save
+
+        appendRandom(memory, self.rng, 10)
+        store.write(store.collect(memory), {'episode': 3})
+        self.assertMemoryEqual(self.loadNew(3)[0], memory)
+
+    def testSnapshotCollectedBeforeFailureIsRejected(self):
+        memory = ReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        for episode in range(1, 3):
+            appendRandom(memory, self.rng, 5)
+            store.write(store.collect(memory), {'episode': episode})
+
+        appendRandom(memory, self.rng, 5)
+        failing = store.collect(memory)
+        appendRandom(memory, self.rng, 5)
+        pending = store.collect(memory)
+        with mock.patch.object(store, 'openArray', failingOpenArray(store, 2)):
+            with self.assertRaises(OSError):
+                store.write(failing, {'episode': 3})
+        with self.assertRaises(ValueError):
+            store.write(pending, {'episode': 4})  # Lacks rows the failed write didn't finish
+        self.assertEqual(self.loadNew()[1]['episode'], 2)
+
+        store.write(store.collect(memory), {'episode': 5})
+        self.assertMemoryEqual(self.loadNew(5)[0], memory)
+
+    def testCrashAfterLoadKeepsSavedSlot(self):
+        memory = ReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        appendRandom(memory, self.rng, 30)
+        store.write(store.collect(memory), {'episode': 1})
+
+        restored, _ = self.loadNew(1)
+        store = ReplayStore(self.directory)
+        store.load(restored, 1)
+        appendRandom(restored, self.rng, 30)
+        with mock.patch.object(store, 'openArray', failingOpenArray(store, 4)):
+            with self.assertRaises(OSError):
+                store.write(store.collect(restored), {'episode': 2})
+
+        self.assertMemoryEqual(self.loadNew(1)[0], memory)
+
+    def testOtherEpisodeIsNotLoaded(self):
+        memory = ReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        appendRandom(memory, self.rng, 10)
+        store.write(store.collect(memory), {'episode': 7})
+
+        loaded, params = self.loadNew(5)
+        self.assertEqual(params['episode'], 7)
+        self.assertEqual((len(loaded), loaded.appendCount), (0, 0))
+
+    def testPrioritiesSavedWithSlot(self):
+        memory = PrioritizedReplayMemory(CAPACITY, STATE_SIZE)
+        store = ReplayStore(self.directory)
+        for episode in range(1, 4):
+            appendRandom(memory, self.rng, 20)
+            indices = np.arange(len(memory))
+            tdErrors = (self.rng.randn(len(indices)) * 5).astype(np.float32)  # Above 1 like the train step gives
+            memory.updatePriorities(indices, tdErrors)
+            store.write(store.collect(memory), {'episode': episode})
+
+        loaded, _ = self.loadNew(3, PrioritizedReplayMemory)
+        self.assertMemoryEqual(loaded, memory)
+        self.assertGreater(loaded.maxPriority, 1.0)
+        self.assertEqual(loaded.maxPriority, memory.maxPriority)
+        np.testing.assert_allclose(loaded.tree.get(np.arange(CAPACITY)), memory.tree.get(np.arange(CAPACITY)))
+
+
+if __name__ == '__main__':
+    unittest.main()
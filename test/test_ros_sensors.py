@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_rospy import importWithFakeRospy, StampedMessage, Time  # noqa: E402
+
+"""
+LatestMessage driven through its callback with a stub rospy
+A thread plays the subscriber thread of rospy and delivers stamped messages while the test waits.
+"""
+
+
+def deliverLater(latest, messages, delay=0.05):
+    '''
+    Call latest.callback with every message, delay seconds apart, in a thread
+
+    return started thread
+    '''
+    def deliver():
+        for msg in messages:
+            time.sleep(delay)
+            latest.callback(msg)
+
+    thread = threading.Thread(target=deliver, daemon=True)
+    thread.start()
+    return thread
+
+
+class LatestMessageTest(unittest.TestCase):
+    def setUp(self):
+        self.rosSensors, self.rospy = importWithFakeRospy('ros_sensors')
+        self.latest = self.rosSensors.LatestMessage('/scan', StampedMessage)
+
+    def testSubscribesOnce(self):
+        self.assertEqual(self.latest.subscriber.topic, '/scan')
+        self.assertEqual(self.latest.subscriber.callback, self.latest.callback)
+
+    def testWaitBlocksUntilNewerStamp(self):
+        after = Time(secs=10)
+        self.latest.callback(StampedMessage(Time(secs=9), 'old'))
+
+        thread = deliverLater(self.latest, [StampedMessage(Time(secs=10), 'same'),
+                                            StampedMessage(Time(secs=11), 'new')])
+        start = time.time()
+        msg = self.latest.waitForFresh(after, timeout=5)
+        thread.join()
+
+        self.assertEqual(msg.name, 'new')
+        self.assertGreaterEqual(time.time() - start, 0.08)  # Both deliveries happened before it returned
+
+    def testReturnsCachedFreshMessage(self):
+        self.latest.callback(StampedMessage(Time(secs=12), 'fresh'))
+        msg = self.latest.waitForFresh(Time(secs=11), timeout=0)
+        self.assertEqual(msg.name, 'fresh')
+
+    def testTimeout(self):
+        self.latest.callback(StampedMessage(Time(secs=5), 'old'))
+        start = time.time()
+        with self.assertRaises(self.rospy.ROSException):
+            self.latest.waitForFresh(Time(secs=5), timeout=0.1)
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+    def testTimeoutWithoutMessage(self):
+        with self.assertRaises(self.rospy.ROSException):
+            self.latest.waitForFresh(Time(secs=0), timeout=0.05)
+
+    def testZeroStampUsesRosTime(self):
+        self.rospy.now = Time(secs=20)
+        self.latest.callback(StampedMessage(Time(), 'unstamped'))
+        self.assertEqual(self.latest.stamp, Time(secs=20))
+        self.assertEqual(self.latest.waitForFresh(Time(secs=19), timeout=0).name, 'unstamped')
+
+    def testClearDropsCachedMessage(self):
+        self.latest.callback(StampedMessage(Time(secs=30), 'beforeReset'))
+        self.latest.clear()
+        with self.assertRaises(self.rospy.ROSException):
+            self.latest.waitForFresh(Time(secs=0), timeout=0.05)
+
+        deliverLater(self.latest, [StampedMessage(Time(secs=1), 'afterReset')]).join()
+        self.assertEqual(self.latest.waitForFresh(Time(secs=0), timeout=0).name, 'afterReset')
+
+
+    def testNoneAcceptsAnyMessage(self):
+        self.latest.callback(StampedMessage(Time(secs=40), 'beforeReset'))
+        self.assertEqual(self.latest.waitForFresh(None, timeout=0).name, 'beforeReset')
+
+        self.latest.clear()
+        deliverLater(self.latest, [StampedMessage(Time(nsecs=1), 'afterReset')])
+        self.assertEqual(self.latest.waitForFresh(None, timeout=5).name, 'afterReset')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import sys
+import math
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from state_reward import calcStates, calcRewards, TARGET_REACH_RANGE  # noqa: E402
+
+"""
+Equivalence of the vectorized state and reward functions with the scalar code they replaced
+Reference functions below are the calculateState and reward loop of the original environments.
+Original code didn't clamp ranges to laserMinRange so it is 0 here, ranges are never above laserMaxRange.
+"""
+MIN_CRASH_RANGE = 0.2
+LASER_MAX_RANGE = 10.0
+ACTION_SIZE = 5
+
+
+def referenceState(ranges, yaw, robotX, robotY, targetPointX, targetPointY):
+    '''
+    Original GazeboGymEnv.calculateState with calcHeadingAngle and calcDistance
+
+    return state in list and isCrash
+    '''
+    targetAngle = math.atan2(targetPointY - robotY, targetPointX - robotX)
+    heading = targetAngle - yaw
+    if heading > math.pi:
+        heading -= 2 * math.pi
+    elif heading < -math.pi:
+        heading += 2 * math.pi
+    heading = round(heading, 2)
+
+    distance = math.sqrt((robotX - targetPointX)**2 + (robotY - targetPointY)**2)
+
+    isCrash = False
+    laserData = list(ranges)
+    for i in range(len(laserData)):
+        if (MIN_CRASH_RANGE > laserData[i] > 0):
+            isCrash = True
+        if np.isinf(laserData[i]):
+            laserData[i] = LASER_MAX_RANGE
+        if np.isnan(laserData[i]):
+            laserData[i] = 0
+
+    obstacleMinRange = round(min(laserData), 2)
+    obstacleAngle = np.argmin(laserData)
+
+    return laserData + [heading, distance, obstacleMinRange, obstacleAngle], isCrash
+
+
+def referenceReward(state, action, targetDistance, isCrash):
+    '''
+    Original reward calculation of GazeboGymEnv.step
+
+    return reward in float
+    '''
+    if isCrash:
+        return -150
+    if state[-3] < TARGET_REACH_RANGE:
+        return 200
+
+    heading = state[-4]
+    yawReward = []
+    for i in range(ACTION_SIZE):
+        angle = -math.pi / 4 + heading + (math.pi / 8 * i) + math.pi / 2
+        tr = 1 - 4 * math.fabs(0.5 - math.modf(0.25 + 0.5 * angle % (2 * math.pi) / math.pi)[0])
+        yawReward.append(tr)
+
+    distanceRate = 2 ** (state[-3] / targetDistance)
+    return (round(yawReward[action] * 5, 2)) * distanceRate
+
+
+def randomScan(rng, beamCount=24):
+    '''
+    return ranges with some inf, nan, zero and crash ranges
+    '''
+    ranges = rng.uniform(0.0, LASER_MAX_RANGE, beamCount)
+    kinds = rng.randint(0, 8, beamCount)
+    ranges[kinds == 0] = np.inf
+    ranges[kinds == 1] = np.nan
+    ranges[kinds == 2] = 0.0
+    ranges[kinds == 3] = rng.uniform(0.0, MIN_CRASH_RANGE, np.count_nonzero(kinds == 3))
+    return ranges
+
+
+def randomPose(rng):
+    '''
+    return yaw, robotX, robotY, targetPointX, targetPointY, targetDistance
+    Target is sometimes in reach range
+    '''
+    yaw = rng.uniform(-math.pi, math.pi)
+    robotX, robotY = rng.uniform(-5, 5, 2)
+    if rng.rand() < 0.2:
+        targetPointX, targetPointY = robotX + rng.uniform(-0.1, 0.1), robotY + rng.uniform(-0.1, 0.1)
+    else:
+        targetPointX, targetPointY = rng.uniform(-5, 5, 2)
+    return yaw, robotX, robotY, targetPointX, targetPointY, rng.uniform(0.5, 8)
+
+
+class StateRewardEquivalenceTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+
+    def assertStateEqual(self, state, expected):
+        np.testing.assert_array_equal(state, np.asarray(expected, dtype=np.float64))
+
+    def testSingleScan(self):
+        for _ in range(2000):
+            ranges = randomScan(self.rng)
+            yaw, robotX, robotY, targetPointX, targetPointY, targetDistance = randomPose(self.rng)
+            action = self.rng.randint(ACTION_SIZE)
+
+            expectedState, expectedCrash = referenceState(ranges, yaw, robotX, robotY, targetPointX, targetPointY)
+            state, isCrash = calcStates(ranges, yaw, robotX, robotY, targetPointX, targetPointY,
+                                        MIN_CRASH_RANGE, 0.0, LASER_MAX_RANGE)
+            self.assertStateEqual(state, expectedState)
+            self.assertEqual(bool(isCrash), expectedCrash)
+
+            reward = calcRewards(state, action, targetDistance, isCrash, state[-3] < TARGET_REACH_RANGE)
+            self.assertEqual(float(reward), referenceReward(expectedState, action, targetDistance, expectedCrash))
+
+    def testBatch(self):
+        count = 500
+        ranges = np.stack([randomScan(self.rng) for _ in range(count)])
+        poses = np.array([randomPose(self.rng) for _ in range(count)])
+        yaw, robotX, robotY, targetPointX, targetPointY, targetDistance = poses.T
+        actions = self.rng.randint(ACTION_SIZE, size=count)
+
+        states, isCrash = calcStates(ranges, yaw, robotX, robotY, targetPointX, targetPointY,
+                                     MIN_CRASH_RANGE, 0.0, LASER_MAX_RANGE)
+        rewards = calcRewards(states, actions, targetDistance, isCrash, states[:, -3] < TARGET_REACH_RANGE)
+
+        self.assertEqual(states.shape, (count, 28))
+        for i in range(count):
+            expectedState, expectedCrash = referenceState(ranges[i], *poses[i, :5])
+            self.assertStateEqual(states[i], expectedState)
+            self.assertEqual(bool(isCrash[i]), expectedCrash)
+            self.assertEqual(rewards[i], referenceReward(expectedState, actions[i], targetDistance[i], expectedCrash))
+
+
+if __name__ == '__main__':
+    unittest.main()
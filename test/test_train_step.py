@@ -0,0 +1,104 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from lidar_dqlearn import Agent  # noqa: E402
+
+try:
+    import keras
+except ImportError:
+    keras = None
+
+"""
+Compiled train step against a NumPy Double DQN reference
+Models have no dropout so Q values of the train pass are the same as the reference ones.
+"""
+STATE_SIZE = 6
+ACTION_SIZE = 5
+BATCH_SIZE = 8
+DISCOUNT = 0.9
+
+
+class NoDropoutAgent(Agent):
+    def initNetwork(self):
+        from keras.models import Sequential
+        from keras.optimizers import RMSprop
+        from keras.layers import Dense
+
+        model = Sequential([Dense(16, input_shape=(self.stateSize,), activation="relu"),
+                            Dense(self.actionSize, activation="linear")])
+        model.compile(loss="mse", optimizer=RMSprop(learning_rate=self.learningRate, rho=0.9, epsilon=1e-06))
+        return model
+
+
+def predict(model, states):
+    return model(states, training=False).numpy()
+
+
+@unittest.skipIf(keras is None, "Keras is not installed")
+class TrainStepTest(unittest.TestCase):
+    def setUp(self):
+        self.savePath = tempfile.mkdtemp() + '/'
+        self.rng = np.random.RandomState(0)
+        keras.utils.set_random_seed(0)
+        self.agent = NoDropoutAgent(STATE_SIZE, ACTION_SIZE, {'savePath': self.savePath, 'batchSize': BATCH_SIZE,
+                                                              'discountFactor': DISCOUNT, 'learningRate': 0.01,
+                                                              'memorySize': 100})
+
+        # Target model lags behind, otherwise Double DQN targets can't be told from max target Q
+        targetWeights = [w + 0.5 * self.rng.randn(*w.shape).astype(np.float32) for w in
+                         self.agent.onlineModel.get_weights()]
+        self.agent.targetModel.set_weights(targetWeights)
+
+    def tearDown(self):
+        self.agent.checkpoints.close()
+        shutil.rmtree(self.savePath)
+
+    def batch(self, actions):
+        states = self.rng.randn(BATCH_SIZE, STATE_SIZE).astype(np.float32)
+        rewards = self.rng.randn(BATCH_SIZE).astype(np.float32)
+        nextStates = self.rng.randn(BATCH_SIZE, STATE_SIZE).astype(np.float32)
+        dones = np.array([False, True] * (BATCH_SIZE // 2))
+        steps = np.array([1, 1, 2, 3] * (BATCH_SIZE // 4), dtype=np.int16)
+        sampleWeights = self.rng.rand(BATCH_SIZE).astype(np.float32)
+        sampleWeights[0] = 0.0
+        return states, np.array(actions, dtype=np.int64), rewards, nextStates, dones, steps, sampleWeights
+
+    def testDoubleDQNTargets(self):
+        states, actions, rewards, nextStates, dones, steps, sampleWeights = batch = self.batch(
+            self.rng.randint(0, ACTION_SIZE, size=BATCH_SIZE))
+
+        qValues = predict(self.agent.onlineModel, states)
+        nextActions = np.argmax(predict(self.agent.onlineModel, nextStates), axis=1)
+        targetNextQ = predict(self.agent.targetModel, nextStates)
+        self.assertTrue(np.any(nextActions != np.argmax(targetNextQ, axis=1)))
+
+        rows = np.arange(BATCH_SIZE)
+        targets = rewards + DISCOUNT ** steps * (1.0 - dones) * targetNextQ[rows, nextActions]
+        expectedErrors = targets - qValues[rows, actions]
+        expectedLoss = np.mean(sampleWeights * expectedErrors ** 2)
+
+        loss, tdErrors, lastQ = self.agent.trainStep(*batch)
+        np.testing.assert_allclose(tdErrors.numpy(), expectedErrors, rtol=1e-5, atol=1e-5)
+        np.testing.assert_allclose(float(loss), expectedLoss, rtol=1e-5)
+        np.testing.assert_allclose(lastQ.numpy(), qValues[-1:], rtol=1e-5)
+
+    def testLossOnlyOnTakenActions(self):
+        batch = self.batch([0, 2] * (BATCH_SIZE // 2))
+        outputBias = self.agent.onlineModel.get_weights()[-1]
+
+        self.agent.trainStep(*batch)
+
+        trainedBias = self.agent.onlineModel.get_weights()[-1]
+        np.testing.assert_array_equal(trainedBias[[1, 3, 4]], outputBias[[1, 3, 4]])  # No gradient
+        self.assertTrue(np.all(trainedBias[[0, 2]] != outputBias[[0, 2]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
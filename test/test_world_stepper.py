@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_rospy import importWithFakeRospy, Publisher, StampedMessage, Time  # noqa: E402
+
+"""
+WorldStepper and LatestMessage against a local stand-in of WorldStepPlugin
+The stand-in receives tick counts on the fake publisher, advances the fake clock tick by tick
+and publishes a stamped message whenever a sensor update period has passed, like Gazebo does.
+"""
+PHYSICS_STEP_NS = 1000000  # 0.001 s max_step_size of maze worlds
+
+
+class FakeWorldStepPlugin():
+    '''
+    Plays Gazebo with WorldStepPlugin loaded
+    Sensor messages are delivered from a thread after a wall delay when delay is given,
+    like rospy subscriber threads that lag behind the simulation
+    '''
+    def __init__(self, rospy, publisher, sensors, delay=None):
+        self.rospy = rospy
+        self.sensors = sensors  # List of (LatestMessage, period in ns)
+        self.delay = delay
+        self.ticks = []  # Tick count of every request
+        self.threads = []
+        publisher.onPublish = self.multiStep
+
+    def multiStep(self, msg):
+        self.ticks.append(msg.data)
+        published = []
+        for _ in range(msg.data):
+            self.rospy.now = Time(nsecs=self.rospy.now.nsecs + PHYSICS_STEP_NS)
+            for latest, period in self.sensors:
+                if self.rospy.now.nsecs % period == 0:
+                    published.append((latest, StampedMessage(self.rospy.now)))
+
+        if self.delay is None:
+            for latest, msg in published:
+                latest.callback(msg)
+        else:
+            thread = threading.Thread(target=self.deliver, args=(published,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def deliver(self, published):
+        for latest, msg in published:
+            time.sleep(self.delay)
+            latest.callback(msg)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+class WorldStepperTest(unittest.TestCase):
+    def setUp(self):
+        self.worldStepper, self.rospy = importWithFakeRospy('world_stepper')
+        self.rosSensors, _ = importWithFakeRospy('ros_sensors')
+        self.rosSensors.rospy = self.rospy  # Both modules on the same clock
+        self.rospy.now = Time(secs=1)
+
+        self.scanSub = self.rosSensors.LatestMessage('/scan', StampedMessage)
+        self.odomSub = self.rosSensors.LatestMessage('/odom', StampedMessage)
+        self.stepper = self.worldStepper.WorldStepper(200, 0.001)
+
+    def makePlugin(self, delay=None):
+        return FakeWorldStepPlugin(self.rospy, self.stepper.publisher,
+                                   [(self.scanSub, 200000000), (self.odomSub, 30000000)], delay)
+
+    def testStepsOnOnePersistentPublisher(self):
+        plugin = self.makePlugin()
+        publisher = self.stepper.publisher
+        for i in range(3):
+            targetTime = self.stepper.step()
+            self.assertEqual(targetTime, Time(nsecs=1000000000 + (i + 1) * 200000000))
+            self.assertEqual(self.rospy.now, targetTime)
+
+        self.assertIs(self.stepper.publisher, publisher)
+        self.assertEqual(publisher.topic, '/gazebo/multi_step')
+        self.assertEqual(plugin.ticks, [200, 200, 200])
+
+    def testTargetCountedFromPreviousStep(self):
+        firstTarget = self.stepper.step()
+        self.scanSub.callback(StampedMessage(firstTarget, 'first'))
+        self.rospy.now = Time(nsecs=1100000000)  # /clock lags behind the ticks done
+
+        targetTime = self.stepper.step()
+        self.assertEqual(targetTime, Time(nsecs=1400000000))
+        with self.assertRaises(self.rospy.ROSException):  # Scan of the first step is not fresh
+            self.scanSub.waitForFresh(self.stepper.sampleAfter(targetTime, 0.2), timeout=0.05)
+
+        self.scanSub.callback(StampedMessage(targetTime, 'second'))
+        self.assertEqual(self.scanSub.waitForFresh(self.stepper.sampleAfter(targetTime, 0.2), timeout=0).name, 'second')
+
+    def testCountsFromResetTime(self):
+        self.stepper.step()
+        self.stepper.reset(Time())  # Simulation time is back to zero, the clock still holds the old time
+        self.assertEqual(self.stepper.step(), Time(nsecs=200000000))
+
+        self.stepper.reset()
+        self.rospy.now = Time(secs=5)
+        self.assertEqual(self.stepper.step(), Time(nsecs=5200000000))
+
+    def testSampleWindowPerSensor(self):
+        targetTime = Time(secs=3)
+        self.assertEqual(self.stepper.sampleAfter(targetTime, 0.03), Time(nsecs=2970000000))
+        self.assertEqual(self.stepper.sampleAfter(targetTime, 0.2), Time(nsecs=2800000000))
+        self.assertEqual(self.stepper.sampleAfter(targetTime, 0.5), Time(nsecs=2800000000))  # Never before the step
+
+    def testWaitsGetLastMessagesOfStep(self):
+        plugin = self.makePlugin(delay=0.002)  # Odom messages of the step arrive one by one
+        for _ in range(3):
+            targetTime = self.stepper.step()
+            scan = self.scanSub.waitForFresh(self.stepper.sampleAfter(targetTime, 0.2), timeout=5)
+            odom = self.odomSub.waitForFresh(self.stepper.sampleAfter(targetTime, 0.03), timeout=5)
+            plugin.join()
+
+            self.assertEqual(scan.header.stamp, targetTime)
+            self.assertLessEqual(odom.header.stamp, targetTime)
+            self.assertGreater(odom.header.stamp, targetTime - self.rospy.Duration.from_sec(0.03))
+
+    def testFailsWithoutPlugin(self):
+        def unconnectedPublisher(*args, **kwargs):
+            publisher = Publisher(*args, **kwargs)
+            publisher.connections = 0
+            return publisher
+
+        self.rospy.Publisher = unconnectedPublisher
+        with self.assertRaises(self.rospy.ROSException):
+            self.worldStepper.WorldStepper(200, 0.001, connectTimeout=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()